@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# measures how much memory the token list and the ast of a large synthetic
+# program take, usage: python -m benchmarks.memory [lines]
+
+import sys
+import tracemalloc
+
+from pox.scanner import Scanner
+from pox.parser import Parser, Expr, Stmt
+
+CHUNK = '''\
+class Point{0} {{
+    init(x, y) {{
+        this.x = x;
+        this.y = y;
+    }}
+
+    norm() {{
+        return this.x * this.x + this.y * this.y;
+    }}
+}}
+
+fn work{0}(n) {{
+    let p = Point{0}(n, n / 2);
+    let s = 'point ' + str(n);
+
+    for (let i = 0; i < n; i = i + 1) {{
+        if (p.norm() > 100 and !(i == 3)) {{
+            s = s + '.';
+        }} else if (i < 0 or false) {{
+            s = nil;
+        }} else {{
+            p.x = -p.x - 1;
+        }}
+    }}
+
+    return s;
+}}
+
+println(work{0}({0}));
+'''
+
+class Reporter:
+    def report_error(self, error):
+        sys.exit(f'synthetic program is invalid: {error}')
+
+def program(lines):
+    chunk = CHUNK.count('\n')
+    return ''.join(CHUNK.format(i) for i in range(lines // chunk + 1))
+
+def children(node):
+    if hasattr(node, '__dict__'):
+        return vars(node).values()
+
+    return [getattr(node, field) for field in node.__slots__]
+
+def count_nodes(nodes):
+    count = 0
+
+    while nodes:
+        match nodes.pop():
+            case Expr() | Stmt() as node:
+                count += 1
+                nodes.extend(children(node))
+            case list() | tuple() as node:
+                nodes.extend(node)
+
+    return count
+
+def measure(fn, *args):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fn(*args)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    return result, size
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    source = program(lines)
+
+    tokens, token_bytes = measure(Scanner(source).scan_tokens, Reporter())
+    statements, ast_bytes = measure(Parser(tokens).parse, Reporter())
+    nodes = count_nodes(list(statements))
+
+    print(f'{source.count(chr(10))} lines, {len(source)} bytes of source')
+    print(f'tokens: {len(tokens):>9} {token_bytes:>12} bytes {token_bytes / len(tokens):>8.1f} bytes/token')
+    print(f'nodes:  {nodes:>9} {ast_bytes:>12} bytes {ast_bytes / nodes:>8.1f} bytes/node')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# runs the pox programs in this directory and times every phase of running
+# them separately, usage: python -m benchmarks.run [options] [names...]
+#
+#   --engine=tree|closure|stack|vm  engine to execute the programs with
+#   --repeat=n                      runs per program, 5 by default
+#   --save=path                     write the results to `path` as a json baseline
+#   --baseline=path                 compare the results against a saved baseline
+#   --threshold=percent             slowdown reported as a regression, 10 by default
+
+import io
+import os
+import sys
+import glob
+import json
+import time
+import platform
+import statistics
+
+from contextlib import redirect_stdout
+
+from pox.__main__ import ENGINES
+from pox.scanner import Scanner
+from pox.parser import Parser, Resolver, Locals, Optimizer
+
+PHASES = ['scan', 'parse', 'resolve', 'optimize', 'execute']
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+class BenchmarkError(Exception):
+    pass
+
+class Reporter:
+    def report_error(self, error):
+        raise BenchmarkError(error)
+
+def timed(times, phase, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    times[phase] = time.perf_counter() - start
+
+    return result
+
+# every run starts from the source, inline caches live on the ast nodes
+# and the interpreter keeps the globals around, neither can be reused
+def run(source, engine):
+    times = {}
+    reporter = Reporter()
+    locals = Locals()
+
+    tokens = timed(times, 'scan', Scanner(source).scan_tokens, reporter)
+    statements = timed(times, 'parse', Parser(tokens).parse, reporter)
+    timed(times, 'resolve', Resolver(reporter, locals).resolve, *statements)
+    statements = timed(times, 'optimize', Optimizer(locals).optimize, statements)
+
+    # the interpreter's output is bound to whatever stdout is when it's made
+    with redirect_stdout(io.StringIO()):
+        interpreter = engine()
+
+        for expr, (depth, slot) in locals.items():
+            interpreter.resolve(expr, depth, slot)
+
+        timed(times, 'execute', interpreter.interpret, statements, reporter)
+
+    return times
+
+def summarize(samples):
+    return {
+        phase: {
+            'median': statistics.median(sample[phase] for sample in samples),
+            'variance': statistics.variance(sample[phase] for sample in samples)
+                        if len(samples) > 1 else 0.0,
+        }
+        for phase in PHASES + ['total']
+    }
+
+def benchmark(path, engine, repeat):
+    with open(path) as file:
+        source = file.read()
+
+    samples = []
+
+    for _ in range(repeat):
+        times = run(source, engine)
+        times['total'] = sum(times.values())
+        samples.append(times)
+
+    return summarize(samples)
+
+def compare(name, results, baseline, threshold):
+    regressions = []
+
+    if (previous := baseline.get(name)) is None:
+        return regressions
+
+    for phase in PHASES + ['total']:
+        before = previous[phase]['median']
+        after = results[phase]['median']
+
+        # phases taking a few milliseconds are mostly noise
+        if before < 5e-3 and after < 5e-3:
+            continue
+
+        change = (after - before) / before * 100 if before else 0.0
+        mark = '  REGRESSION' if change > threshold else ''
+
+        print(f'    {phase:<9} {before * 1e3:>10.2f} -> {after * 1e3:>10.2f} ms {change:>+7.1f}%{mark}')
+
+        if mark:
+            regressions.append((name, phase))
+
+    return regressions
+
+def main():
+    options = {'engine': 'tree', 'repeat': '5', 'threshold': '10'}
+    names = []
+
+    for arg in sys.argv[1:]:
+        match arg.split('=', 1):
+            case [option, value] if option.startswith('--') and \
+                    option[2:] in ('engine', 'repeat', 'save', 'baseline', 'threshold'):
+                options[option[2:]] = value
+            case [name] if not name.startswith('--'):
+                names.append(name)
+            case _:
+                return print(f'unknown option: {arg}') or 64
+
+    if options['engine'] not in ENGINES:
+        return print(f'unknown engine: {options["engine"]}') or 64
+
+    engine = ENGINES[options['engine']]
+    repeat = int(options['repeat'])
+    threshold = float(options['threshold'])
+
+    paths = sorted(glob.glob(os.path.join(ROOT, '*.pox')))
+    paths = [p for p in paths if not names or os.path.basename(p)[:-4] in names]
+
+    baseline = {}
+
+    if path := options.get('baseline'):
+        with open(path) as file:
+            saved = json.load(file)
+
+        if saved['engine'] != options['engine']:
+            print(f'warning: baseline was recorded with --engine={saved["engine"]}')
+
+        baseline = saved['benchmarks']
+
+    print(f'engine: {options["engine"]}, {repeat} runs, python {platform.python_version()}')
+    print(f'{"":<12} {"phase":<9} {"median ms":>10} {"stdev ms":>10}')
+
+    results = {}
+    regressions = []
+
+    for path in paths:
+        name = os.path.basename(path)[:-4]
+        results[name] = benchmark(path, engine, repeat)
+
+        for phase in PHASES + ['total']:
+            median = results[name][phase]['median']
+            stdev = results[name][phase]['variance'] ** 0.5
+
+            print(f'{name if phase == "scan" else "":<12} {phase:<9} {median * 1e3:>10.2f} {stdev * 1e3:>10.2f}')
+
+        if baseline:
+            regressions += compare(name, results[name], baseline, threshold)
+
+    if path := options.get('save'):
+        with open(path, 'w') as file:
+            json.dump({
+                'engine': options['engine'],
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'repeat': repeat,
+                'benchmarks': results,
+            }, file, indent=2)
+
+    if regressions:
+        print(f'{len(regressions)} regressions over {threshold:g}%')
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# compares the regex scanner against the one character at a time one on the
+# example programs concatenated to a few megabytes, checking that both give
+# the exact same tokens. usage: python -m benchmarks.tokenizer [megabytes]
+
+import sys
+import glob
+import time
+
+from pox.scanner import Scanner
+
+class Reporter:
+    def report_error(self, error):
+        print(error)
+
+def source(size):
+    examples = ''.join(open(path).read() + '\n' for path in sorted(glob.glob('examples/*.pox')))
+    return examples * (size // len(examples) + 1)
+
+def scan(source, mode):
+    scanner = Scanner(source)
+    tokens = getattr(scanner, mode)(Reporter())
+
+    start = time.perf_counter()
+    tokens = list(tokens)
+
+    return tokens, time.perf_counter() - start
+
+def key(token):
+    return (token.type, token.lexeme, type(token.literal), token.literal, token.line)
+
+def main():
+    size = int(float(sys.argv[1]) * 1024 * 1024) if len(sys.argv) > 1 else 4 * 1024 * 1024
+    text = source(size)
+    results = {}
+
+    for mode in ['char_tokens', 'tokens']:
+        tokens, elapsed = min((scan(text, mode) for _ in range(3)), key=lambda r: r[1])
+        results[mode] = tokens
+        print(f'{mode:<12} {len(tokens):>9} tokens {elapsed:>7.3f}s '
+              f'{len(text) / elapsed / 1024 / 1024:>6.2f} MB/s {len(tokens) / elapsed:>10.0f} tokens/s')
+
+    if list(map(key, results['tokens'])) != list(map(key, results['char_tokens'])):
+        sys.exit('token streams differ')
+
+if __name__ == '__main__':
+    main()
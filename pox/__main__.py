@@ -2,12 +2,34 @@
 
 import sys
 
+from pox.cache import ProgramCache
 from pox.scanner import Scanner
-from pox.parser import Parser, Resolver
-from pox.interpreter import Interpreter, RuntimeError
+from pox.parser import Parser, Resolver, Locals, Optimizer
+from pox.interpreter import Interpreter, CompilingInterpreter, StackInterpreter, RuntimeError
+from pox.interpreter.cache import report_caches
+from pox.interpreter.profiler import Profiler
+from pox.interpreter.hooks import Counters, TracingInterpreter
+from pox.vm import VM
+
+USAGE = 'usage: pox [--engine=tree|closure|stack|vm] [--max-depth=n] [--optimize=on|off|stats] [--ast-cache=on|off] [--cache-stats] [--stats] [--profile[=path]] [path]'
+
+ENGINES = {
+    'tree': Interpreter,
+    'closure': CompilingInterpreter,
+    'stack': StackInterpreter,
+    'vm': VM,
+}
 
 class Pox:
-    def __init__(self):
+    def __init__(self, engine=Interpreter):
+        self.engine = engine
+        self.cache_stats = False
+        self.stats = False
+        self.optimizer = 'on'
+        self.ast_cache = 'on'
+        self.profile = None
+        self.profiler = None
+        self.max_depth = None
         self.error_occured = False
         self.runtime_error_occured = False
 
@@ -20,9 +42,33 @@ class Pox:
 
         self.error_occured = True
 
+    def interpreter(self):
+        options = {'cache_stats': True} if self.cache_stats else {}
+
+        if self.max_depth:
+            options['max_depth'] = self.max_depth
+
+        if self.stats:
+            return TracingInterpreter(Counters(), **options)
+
+        return self.engine(**options)
+
+    def report(self, interpreter):
+        if self.cache_stats:
+            report_caches(interpreter.caches)
+
+        if self.stats:
+            interpreter.hooks.report()
+
+        if self.profiler:
+            self.profiler.report()
+
+            if self.profile is not True:
+                self.profiler.write_collapsed(self.profile)
+
     def repl(self):
         import readline as _
-        interpreter = Interpreter()
+        interpreter = self.interpreter()
 
         while True:
             try:
@@ -36,37 +82,125 @@ class Pox:
                 print(err)
 
     def run_file(self, path):
+        interpreter = self.interpreter()
+        # the optimizer's stats are counted as it runs, which a cached
+        # program skips
+        caching = self.ast_cache == 'on' and self.optimizer != 'stats'
+        cache = ProgramCache() if caching else None
+        self.profiler = Profiler() if self.profile else None
+
         try:
-            return self.run(open(path, 'r').read(), Interpreter())
+            with open(path, 'r') as file:
+                source = file.read()
+
+            return self.run(source, interpreter, cache)
         except KeyboardInterrupt:
             return 2
+        finally:
+            self.report(interpreter)
 
     def main(self):
-        match len(sys.argv):
-            case 1:
+        if sys.argv[1:2] == ['batch']:
+            from pox.batch import main as batch
+            return batch(sys.argv[2:])
+
+        paths = []
+
+        for arg in sys.argv[1:]:
+            match arg.split('=', 1):
+                case ['--engine', engine] if engine in ENGINES:
+                    self.engine = ENGINES[engine]
+                case ['--optimize', mode] if mode in ('on', 'off', 'stats'):
+                    self.optimizer = mode
+                case ['--ast-cache', mode] if mode in ('on', 'off'):
+                    self.ast_cache = mode
+                case ['--cache-stats']:
+                    self.cache_stats = True
+                case ['--stats']:
+                    self.stats = True
+                case ['--profile']:
+                    self.profile = True
+                case ['--profile', path]:
+                    self.profile = path
+                case ['--max-depth', depth] if depth.isdigit() and int(depth) > 0:
+                    self.max_depth = int(depth)
+                case [flag, *_] if flag.startswith('--'):
+                    return print(USAGE) or 64
+                case _:
+                    paths.append(arg)
+
+        # inline caches and hooks only exist in the tree walking interpreter
+        if (self.cache_stats or self.stats) and self.engine is not Interpreter:
+            return print(USAGE) or 64
+
+        # the vm and the stack engine run pox calls in their own loop, there's
+        # nothing to hook. they're also the only ones with a depth to limit
+        if self.profile and self.engine in (VM, StackInterpreter):
+            return print(USAGE) or 64
+
+        if self.max_depth and self.engine not in (VM, StackInterpreter):
+            return print(USAGE) or 64
+
+        match len(paths):
+            case 0:
                 return self.repl()
-            case 2:
-                return self.run_file(sys.argv[1])
+            case 1:
+                return self.run_file(paths[0])
             case _:
-                return print("usage: pox [path]") or 64
+                return print(USAGE) or 64
 
-    def run(self, source, interpreter):
-        statements = self.parse(self.tokenize(source))
+    def run(self, source, interpreter, cache=None):
+        options = (self.optimizer != 'off',)
+        program = cache.load(source, *options) if cache else None
 
-        if not self.error_occured:
-            resolver = Resolver(self, interpreter)
-            resolver.resolve(*statements)
+        if program is None:
+            program = self.compile(source)
+
+            if cache and not self.error_occured:
+                cache.store(program, source, *options)
 
         if not self.error_occured:
-            interpreter.interpret(statements, self)
+            statements, locals = program
+
+            for expr, (depth, slot) in locals.items():
+                interpreter.resolve(expr, depth, slot)
+
+            interpreter.sources.append(source)
+
+            if self.profiler:
+                self.profiler.run(interpreter.interpret, statements, self)
+            else:
+                interpreter.interpret(statements, self)
 
         if self.error_occured:
             return 65
 
         return 70 if self.runtime_error_occured else 0
 
+    def compile(self, source):
+        statements = self.parse(self.tokenize(source))
+        locals = Locals()
+
+        if not self.error_occured:
+            Resolver(self, locals).resolve(*statements)
+
+        if not self.error_occured and self.optimizer != 'off':
+            statements = self.optimize(statements, locals)
+
+        return statements, locals
+
+    def optimize(self, statements, locals):
+        optimizer = Optimizer(locals)
+        statements = optimizer.optimize(statements)
+
+        if self.optimizer == 'stats':
+            print(f'optimizer: {optimizer.folded} folded, {optimizer.pruned} pruned',
+                  file=sys.stderr)
+
+        return statements
+
     def tokenize(self, source):
-        return Scanner(source).scan_tokens(self)
+        return Scanner(source).tokens(self)
 
     def parse(self, tokens):
         return Parser(tokens).parse(self)
@@ -0,0 +1,126 @@
+# coding: utf-8
+
+import io
+import os
+import sys
+import glob
+import json
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+
+from pox.__main__ import Pox, ENGINES
+
+USAGE = 'usage: pox batch [--engine=tree|closure|stack|vm] [--workers=n] [--manifest=path] [--output=path] [paths or globs...]'
+
+# exit code of a script that couldn't be read, as in sysexits.h
+EX_NOINPUT = 66
+
+# exit code of a runtime error, for scripts that stop on a python error
+EX_SOFTWARE = 70
+
+# runs in the workers, which import this module (and every engine with it)
+# once when they start. each script gets a `Pox` and an interpreter of its own
+def run_script(path, engine):
+    pox = Pox(ENGINES[engine])
+    error = None
+
+    # a text stream over bytes, so that `buffer.write` has somewhere to go
+    stdout = io.TextIOWrapper(io.BytesIO(), encoding='utf-8', newline='')
+    start = time.perf_counter()
+
+    with redirect_stdout(stdout):
+        try:
+            code = pox.run_file(path)
+        except SystemExit as exit:
+            code = exit.code if isinstance(exit.code, int) else int(exit.code is not None)
+        except OSError as err:
+            code, error = EX_NOINPUT, str(err)
+        except Exception as err:
+            # a bug of the interpreter (or python running out of stack) only
+            # fails this script, the rest of the batch still gets reported
+            code, error = EX_SOFTWARE, f'{type(err).__name__}: {err}'
+
+    seconds = time.perf_counter() - start
+    stdout.flush()
+
+    return {
+        'path': path,
+        'exit_code': code,
+        'seconds': seconds,
+        'stdout': stdout.buffer.getvalue().decode('utf-8', errors='replace'),
+        'error': error,
+    }
+
+def read_manifest(path):
+    root = os.path.dirname(path)
+
+    with open(path, 'r') as file:
+        lines = [line.strip() for line in file]
+
+    return [os.path.join(root, line) for line in lines if line and not line.startswith('#')]
+
+def expand(patterns):
+    paths = []
+
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            paths.extend(sorted(glob.glob(pattern, recursive=True)))
+        else:
+            paths.append(pattern)
+
+    return paths
+
+def main(args):
+    options = {'engine': 'tree', 'workers': None, 'output': None}
+    patterns = []
+
+    for arg in args:
+        match arg.split('=', 1):
+            case ['--engine', engine] if engine in ENGINES:
+                options['engine'] = engine
+            case ['--workers', n] if n.isdigit() and int(n) > 0:
+                options['workers'] = int(n)
+            case ['--output', path]:
+                options['output'] = path
+            case ['--manifest', path]:
+                try:
+                    patterns.extend(read_manifest(path))
+                except OSError as err:
+                    return print(err) or EX_NOINPUT
+            case [flag, *_] if flag.startswith('--'):
+                return print(USAGE) or 64
+            case _:
+                patterns.append(arg)
+
+    if not (paths := expand(patterns)):
+        return print(USAGE) or 64
+
+    workers = options['workers'] or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    # scripts are handed out a few at a time, most of them run for less time
+    # than it takes to send one to a worker and get its result back
+    with ProcessPoolExecutor(workers) as pool:
+        scripts = list(pool.map(
+            run_script, paths, [options['engine']] * len(paths),
+            chunksize=max(1, len(paths) // (workers * 4))))
+
+    failed = sum(script['exit_code'] != 0 for script in scripts)
+    summary = {
+        'engine': options['engine'],
+        'scripts': scripts,
+        'total': len(scripts),
+        'failed': failed,
+        'seconds': time.perf_counter() - start,
+    }
+
+    if options['output']:
+        with open(options['output'], 'w') as file:
+            json.dump(summary, file, indent=2)
+    else:
+        json.dump(summary, sys.stdout, indent=2)
+        print()
+
+    return 1 if failed else 0
@@ -0,0 +1,74 @@
+# coding: utf-8
+
+import os
+import sys
+import pickle
+import hashlib
+
+import pox
+
+# programs run from a file are stored after being parsed, resolved and
+# optimized, together with what the resolver found for their names, so
+# running the same file again skips all of that. entries are keyed on the
+# source, the optimizer setting and on the pox and python versions, plus the
+# code that produces them so a change to the parser doesn't load stale trees
+
+SOURCES = [
+    'scanner/scanner.py', 'scanner/token.py',
+    'parser/parser.py', 'parser/exprs.py', 'parser/stmts.py',
+    'parser/resolver.py', 'parser/optimizer.py', 'utils.py',
+]
+
+def cache_dir():
+    if path := os.environ.get('POX_CACHE_DIR'):
+        return path
+
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'pox')
+
+def fingerprint():
+    digest = hashlib.sha256(f'{pox.__version__} {sys.version_info[:2]}'.encode())
+    root = os.path.dirname(pox.__file__)
+
+    for path in SOURCES:
+        with open(os.path.join(root, path), 'rb') as file:
+            digest.update(file.read())
+
+    return digest.digest()
+
+class ProgramCache:
+    def __init__(self, path=None):
+        self.path = path or cache_dir()
+        self.version = fingerprint()
+
+    def entry(self, source, *options):
+        digest = hashlib.sha256(self.version)
+        digest.update(repr(options).encode())
+        digest.update(source.encode('utf-8', 'surrogatepass'))
+
+        return os.path.join(self.path, digest.hexdigest() + '.ast')
+
+    # a broken or unreadable entry is the same as a missing one
+    def load(self, source, *options):
+        try:
+            with open(self.entry(source, *options), 'rb') as file:
+                return pickle.load(file)
+        except Exception:
+            return None
+
+    def store(self, program, source, *options):
+        path = self.entry(source, *options)
+        temp = f'{path}.{os.getpid()}'
+
+        try:
+            os.makedirs(self.path, exist_ok=True)
+
+            with open(temp, 'wb') as file:
+                pickle.dump(program, file, pickle.HIGHEST_PROTOCOL)
+
+            os.replace(temp, path)
+        except (OSError, pickle.PicklingError, RecursionError):
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
@@ -15,17 +15,36 @@ class ResolveError(Exception):
         self.token = token
         self.message = message
 
+class CompileError(Exception):
+    def __init__(self, token, message):
+        self.token = token
+        self.message = message
+
 class RuntimeError(Exception):
     def __init__(self, token, message):
         self.token = token
         self.message = message
 
+# raised by natives, which don't know where they were called from. the
+# engines turn it into a `RuntimeError` about the call
+class NativeError(Exception):
+    def __init__(self, message):
+        self.message = message
+
+# errors given a line are about a token that started on it, the others are
+# about the character that was just scanned. either way the line is cut out
+# of the source around that position instead of splitting all of it, and
+# numbered by the newlines before it so the two can't disagree
 def build_syntax_error(scanner, message, line=None):
-    line = line if line else scanner.line
+    source = scanner.source
+    position = scanner.start if line else scanner.current - 1
+
+    start = source.rfind('\n', 0, position) + 1
+    end = source.find('\n', position)
 
     return SYNTAX_ERROR_TEMPLATE.format(
-        line=line,
-        line_text=scanner.source.split('\n')[line - 1],
+        line=source.count('\n', 0, start) + 1,
+        line_text=source[start:end if end != -1 else len(source)],
         message=message)
 
 def build_parse_error(parser, message):
@@ -1,3 +1,5 @@
 # coding: utf-8
 
 from .interpreter import Interpreter, RuntimeError
+from .compiler import CompilingInterpreter
+from .stack import StackInterpreter
@@ -0,0 +1,64 @@
+# coding: utf-8
+
+import sys
+
+# number of different receivers a site caches before it's megamorphic
+POLYMORPHIC_LIMIT = 4
+
+# cache entry of a `Get` or `Call` site whose class has no such method
+NO_METHOD = object()
+
+# `Get` and `Call` nodes carry one of these once executed, keyed on
+# the receiver's class (or the callee itself for plain calls). entries only
+# describe the class, fields are per instance and are always looked up
+# before a cached method so a field shadowing a method can't go stale
+class InlineCache:
+    __slots__ = ('entries', 'lookup', 'megamorphic')
+
+    def __init__(self):
+        self.entries = {}
+        self.lookup = self.entries.get
+        self.megamorphic = False
+
+    def update(self, key, entry):
+        if len(self.entries) < POLYMORPHIC_LIMIT:
+            self.entries[key] = entry
+        else:
+            self.megamorphic = True
+
+class CountingInlineCache(InlineCache):
+    __slots__ = ('kind', 'token', 'hits', 'misses')
+
+    def __init__(self, kind, token):
+        super().__init__()
+        self.kind = kind
+        self.token = token
+        self.hits = 0
+        self.misses = 0
+        self.lookup = self.count
+
+    def count(self, key):
+        if (entry := self.entries.get(key)) is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return entry
+
+    def state(self):
+        if self.megamorphic:
+            return 'megamorphic'
+
+        return 'polymorphic' if len(self.entries) > 1 else 'monomorphic'
+
+REPORT_HEADER = f'{"line":>6}  {"kind":<6}  {"name":<16}  {"hits":>10}  {"misses":>8}  {"keys":>4}  state'
+REPORT_LINE = '{0.token.line:>6}  {0.kind:<6}  {1:<16}  {0.hits:>10}  {0.misses:>8}  {2:>4}  {3}'
+REPORT_ORDER = {'megamorphic': 0, 'polymorphic': 1, 'monomorphic': 2}
+
+def report_caches(caches, file=sys.stderr):
+    print(f'inline caches: {len(caches)} sites', file=file)
+    print(REPORT_HEADER, file=file)
+
+    for cache in sorted(caches, key=lambda c: (REPORT_ORDER[c.state()], -c.misses)):
+        print(REPORT_LINE.format(
+            cache, cache.token.lexeme, len(cache.entries), cache.state()), file=file)
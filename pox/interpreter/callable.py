@@ -2,13 +2,54 @@
 
 from abc import ABC, abstractmethod
 
-from pox.error import RuntimeError
-from pox.interpreter.environment import Environment
+from pox.error import NativeError, RuntimeError
+from pox.interpreter.environment import Frame
+
+# completion signal of a `return` statement, statements evaluate to `None`
+# otherwise and the signal is passed up until it reaches the function call
+class ReturnValue:
+    __slots__ = ('value',)
 
-class ReturnException(Exception):
     def __init__(self, value):
         self.value = value
 
+# what a `return f(...)` in tail position evaluates to, the callee and its
+# arguments are checked but the call is left to the function returning it
+class TailCall:
+    __slots__ = ('function', 'arguments', 'paren')
+
+    def __init__(self, function, arguments, paren):
+        self.function = function
+        self.arguments = arguments
+        self.paren = paren
+
+# what a `yield` statement hands back to whoever resumed the generator
+class Yielded:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+# makes the calls handed back by `TailCall`s one after the other, so that a
+# chain of them runs in the python frame of the call that started it
+def trampoline(interpreter, signal):
+    while type(signal) is TailCall:
+        function, arguments = signal.function, signal.arguments
+
+        match function:
+            case PoxFunction() if not function.initializer:
+                signal = function.tail_call(interpreter, arguments)
+            case BoundMethod(method=PoxFunction() as method) if not method.initializer:
+                signal = method.tail_call(interpreter, arguments, function.receiver)
+            case _:
+                try:
+                    return function.call(interpreter, arguments)
+                except NativeError as err:
+                    raise RuntimeError(signal.paren, err.message)
+
+    if signal is not None:
+        return signal.value
+
 class PoxCallable(ABC):
     @abstractmethod
     def arity(self):
@@ -31,25 +72,58 @@ class PoxFunction(PoxCallable):
         return len(self.declaration.params)
 
     def call(self, interpreter, arguments):
-        environment = Environment(self.closure)
+        signal = self.run(interpreter, list(arguments))
 
-        for i, param in enumerate(self.declaration.params):
-            environment.define(param.lexeme, arguments[i])
+        if signal is not None:
+            return signal.value if type(signal) is ReturnValue else trampoline(interpreter, signal)
 
-        try:
-            interpreter.execute_block(self.declaration.body, environment)
-        except ReturnException as return_value:
-            if not self.initializer:
-                return return_value.value
+    # methods keep `this` in the first slot of their own frame, so calling
+    # one on an instance doesn't need a bound copy of the function
+    def invoke(self, interpreter, instance, arguments):
+        signal = self.run(interpreter, [instance, *arguments])
 
         if self.initializer:
-            return self.closure.get_at(0, 'this')
+            return instance
+
+        if signal is not None:
+            return signal.value if type(signal) is ReturnValue else trampoline(interpreter, signal)
+
+    # a call made by `trampoline`, which leaves the signal to it. it's only
+    # its own method so that the profiler sees the calls it makes
+    def tail_call(self, interpreter, arguments, instance=None):
+        values = list(arguments) if instance is None else [instance, *arguments]
+        return self.run(interpreter, values)
+
+    # runs the body with `values` in its frame, returns the completion signal
+    def run(self, interpreter, values):
+        return interpreter.execute_block(self.declaration.body, Frame(self.closure, values))
 
     def bind(self, instance):
-        environment = Environment(self.closure)
-        environment.define('this', instance)
+        return BoundMethod(instance, self)
 
-        return PoxFunction(environment, self.declaration, self.initializer)
+# a function with a `yield` in it. calling one only sets up its frame, the
+# body runs a bit at a time on a `StackInterpreter` (whichever engine made
+# the call) as the generator it returns is iterated
+class GeneratorFunction(PoxFunction):
+    def run(self, interpreter, values):
+        from .stack import PoxGenerator
+        return ReturnValue(PoxGenerator(interpreter, self, values))
+
+class BoundMethod(PoxCallable):
+    __slots__ = ('receiver', 'method')
+
+    def __init__(self, receiver, method):
+        self.receiver = receiver
+        self.method = method
+
+    def __str__(self):
+        return str(self.method)
+
+    def arity(self):
+        return self.method.arity()
+
+    def call(self, interpreter, arguments):
+        return self.method.invoke(interpreter, self.receiver, arguments)
 
 class PoxInstance:
     def __init__(self, pclass):
@@ -77,15 +151,14 @@ class PoxClass(PoxCallable):
         self.methods = methods
         self.superclass = superclass
 
+        # methods of the whole class hierarchy, flattened once up front
+        self.table = {**superclass.table, **methods} if superclass else methods
+
     def __str__(self):
         return f'<class {self.name}>'
 
     def find_method(self, name):
-        if method := self.methods.get(name):
-            return method
-
-        if self.superclass:
-            return self.superclass.find_method(name)
+        return self.table.get(name)
 
     def arity(self):
         if init := self.find_method('init'):
@@ -97,6 +170,6 @@ class PoxClass(PoxCallable):
         instance = PoxInstance(self)
 
         if init := self.find_method('init'):
-            init.bind(instance).call(interpreter, arguments)
+            init.invoke(interpreter, instance, arguments)
 
         return instance
@@ -0,0 +1,411 @@
+# coding: utf-8
+
+from numbers import Number
+
+from pox.error import NativeError, RuntimeError
+from pox.utils import stringify
+
+from pox.scanner import TokenType
+from pox.parser import ExprVisitor, StmtVisitor
+from pox.parser.exprs import Get
+
+from .callable import *
+from .environment import Frame
+from .interpreter import Interpreter
+
+# every node of the resolved tree is turned into a python closure taking the
+# current environment, with operators, scope distances and names picked up
+# front so that running the program doesn't go through `accept` and `match`
+
+def numeric(op, fn):
+    def _fn(lt, rt):
+        if not (isinstance(lt, Number) and isinstance(rt, Number)):
+            raise RuntimeError(op, 'operands must be numbers')
+
+        return fn(lt, rt)
+
+    return _fn
+
+def divide(op):
+    def _fn(lt, rt):
+        if not (isinstance(lt, Number) and isinstance(rt, Number)):
+            raise RuntimeError(op, 'operands must be numbers')
+
+        if rt == 0:
+            raise RuntimeError(op, 'division by zero')
+
+        return lt / rt
+
+    return _fn
+
+def add(op):
+    def _fn(lt, rt):
+        try:
+            if isinstance(lt, str) or isinstance(rt, str):
+                return f'{stringify(lt)}{stringify(rt)}'
+
+            return lt + rt
+        except TypeError:
+            raise RuntimeError(op, 'operands must be numbers or strings')
+
+    return _fn
+
+BINARY_OPERATORS = {
+    TokenType.MINUS:         lambda op: numeric(op, lambda lt, rt: lt  - rt),
+    TokenType.STAR:          lambda op: numeric(op, lambda lt, rt: lt  * rt),
+    TokenType.LESS:          lambda op: numeric(op, lambda lt, rt: lt  < rt),
+    TokenType.GREATER:       lambda op: numeric(op, lambda lt, rt: lt  > rt),
+    TokenType.LESS_EQUAL:    lambda op: numeric(op, lambda lt, rt: lt <= rt),
+    TokenType.GREATER_EQUAL: lambda op: numeric(op, lambda lt, rt: lt >= rt),
+    TokenType.EQUAL_EQUAL:   lambda op: lambda lt, rt: lt == rt,
+    TokenType.BANG_EQUAL:    lambda op: lambda lt, rt: not (lt == rt),
+    TokenType.SLASH:         divide,
+    TokenType.PLUS:          add,
+}
+
+def run_all(stmts):
+    match stmts:
+        case []:
+            return lambda env: None
+        case [a]:
+            return a
+        case [a, b]:
+            def _run(env):
+                return a(env) or b(env)
+        case _:
+            def _run(env):
+                for stmt in stmts:
+                    if (signal := stmt(env)) is not None:
+                        return signal
+
+    return _run
+
+class CompiledFunction(PoxFunction):
+    def __init__(self, closure, declaration, initializer, body):
+        super().__init__(closure, declaration, initializer)
+        self.body = body
+
+    def run(self, interpreter, values):
+        return self.body(Frame(self.closure, values))
+
+class Compiler(ExprVisitor, StmtVisitor):
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+
+    def compile(self, node):
+        return node.accept(self)
+
+    def compile_block(self, stmts):
+        return run_all([self.compile(stmt) for stmt in stmts if stmt])
+
+    def compile_lookup(self, name, expr):
+        globals = self.interpreter.globals
+
+        match self.interpreter.locals.get(expr):
+            case None:
+                return lambda env: globals.get(name)
+            case (0, slot):
+                return lambda env: env.values[slot]
+            case (1, slot):
+                return lambda env: env.enclosing.values[slot]
+            case (distance, slot):
+                return lambda env: env.ancestor(distance).values[slot]
+
+    def visit_binary_expr(self, expr):
+        lt = self.compile(expr.lt)
+        rt = self.compile(expr.rt)
+        op = BINARY_OPERATORS[expr.op.type](expr.op)
+
+        return lambda env: op(lt(env), rt(env))
+
+    def visit_grouping_expr(self, expr):
+        return self.compile(expr.expression)
+
+    def visit_get_expr(self, expr):
+        object = self.compile(expr.object)
+        name = expr.name
+
+        def _get(env):
+            instance = object(env)
+
+            if isinstance(instance, PoxInstance):
+                return instance.get(name)
+
+            raise RuntimeError(name, 'only instances have properties')
+
+        return _get
+
+    def visit_literal_expr(self, expr):
+        value = expr.value
+        return lambda env: value
+
+    def visit_logical_expr(self, expr):
+        lt = self.compile(expr.lt)
+        rt = self.compile(expr.rt)
+
+        if expr.op.type == TokenType.OR:
+            def _or(env):
+                return value if (value := lt(env)) else rt(env)
+
+            return _or
+
+        def _and(env):
+            return rt(env) if (value := lt(env)) else value
+
+        return _and
+
+    def visit_set_expr(self, expr):
+        object = self.compile(expr.object)
+        value = self.compile(expr.value)
+        name = expr.name
+
+        def _set(env):
+            instance = object(env)
+
+            if not isinstance(instance, PoxInstance):
+                raise RuntimeError(name, 'only instances have fields')
+
+            instance.set(name, result := value(env))
+            return result
+
+        return _set
+
+    def visit_super_expr(self, expr):
+        distance, slot = self.interpreter.locals.get(expr)
+        method = expr.method
+
+        def _super(env):
+            superclass = env.get_at(distance, slot)
+            object = env.get_at(distance - 1, 0)
+
+            if function := superclass.find_method(method.lexeme):
+                return function.bind(object)
+
+            raise RuntimeError(method, f'undefined property {method.lexeme}')
+
+        return _super
+
+    def visit_this_expr(self, expr):
+        return self.compile_lookup(expr.keyword, expr)
+
+    def visit_unary_expr(self, expr):
+        right = self.compile(expr.expression)
+        op = expr.op
+
+        if op.type == TokenType.BANG:
+            return lambda env: not right(env)
+
+        def _negate(env):
+            value = right(env)
+
+            if not isinstance(value, Number):
+                raise RuntimeError(op, 'operands must be numbers')
+
+            return -value
+
+        return _negate
+
+    def visit_call_expr(self, expr):
+        if type(expr.callee) is Get:
+            return self.compile_invoke(expr)
+
+        callee = self.compile(expr.callee)
+        arguments = [self.compile(argument) for argument in expr.arguments]
+        interpreter = self.interpreter
+        paren = expr.paren
+
+        def _call(env):
+            function = callee(env)
+            values = [argument(env) for argument in arguments]
+
+            return interpreter.call(function, values, paren)
+
+        return _call
+
+    def compile_invoke(self, expr):
+        object = self.compile(expr.callee.object)
+        arguments = [self.compile(argument) for argument in expr.arguments]
+        interpreter = self.interpreter
+        paren = expr.paren
+        token = expr.callee.name
+        name = token.lexeme
+
+        def _invoke(env):
+            instance = object(env)
+
+            if isinstance(instance, PoxInstance) and name not in instance.fields \
+                    and (method := instance.pclass.table.get(name)):
+                values = [argument(env) for argument in arguments]
+                interpreter.check_arity(method, values, paren)
+
+                try:
+                    return method.invoke(interpreter, instance, values)
+                except NativeError as err:
+                    raise RuntimeError(paren, err.message)
+
+            function = interpreter.get_property(instance, token)
+            values = [argument(env) for argument in arguments]
+
+            return interpreter.call(function, values, paren)
+
+        return _invoke
+
+    def visit_variable_expr(self, expr):
+        return self.compile_lookup(expr.name, expr)
+
+    def visit_assign_expr(self, expr):
+        value = self.compile(expr.value)
+        globals = self.interpreter.globals
+        name = expr.name
+
+        match self.interpreter.locals.get(expr):
+            case None:
+                def _assign(env):
+                    globals.assign(name, result := value(env))
+                    return result
+            case (0, slot):
+                def _assign(env):
+                    env.values[slot] = result = value(env)
+                    return result
+            case (distance, slot):
+                def _assign(env):
+                    env.ancestor(distance).values[slot] = result = value(env)
+                    return result
+
+        return _assign
+
+    def visit_function_stmt(self, stmt):
+        name = stmt.name.lexeme
+
+        # generators aren't compiled, their bodies run on a `StackInterpreter`
+        if stmt.generator:
+            return lambda env: env.define(name, GeneratorFunction(env, stmt, False))
+
+        body = self.compile_block(stmt.body.statements)
+
+        def _function(env):
+            env.define(name, CompiledFunction(env, stmt, False, body))
+
+        return _function
+
+    def visit_if_stmt(self, stmt):
+        branches = [(self.compile(cond), self.compile(branch)) for cond, branch in stmt.branches]
+        else_branch = self.compile(stmt.else_branch) if stmt.else_branch else None
+
+        def _if(env):
+            for cond, branch in branches:
+                if cond(env):
+                    return branch(env)
+
+            if else_branch is not None:
+                return else_branch(env)
+
+        return _if
+
+    def visit_block_stmt(self, stmt):
+        body = self.compile_block(stmt.statements)
+        return lambda env: body(Frame(env))
+
+    def visit_class_stmt(self, stmt):
+        superclass = self.compile(stmt.superclass) if stmt.superclass else None
+        methods = [
+            (method, None if method.generator else self.compile_block(method.body.statements))
+            for method in stmt.methods]
+        name = stmt.name
+
+        def _class(env):
+            base = None
+
+            if superclass:
+                base = superclass(env)
+
+                if not isinstance(base, PoxClass):
+                    raise RuntimeError(
+                        stmt.superclass.name, '`superclass` must be a class')
+
+            closure = Frame(env, [base]) if superclass else env
+
+            env.define(name.lexeme, PoxClass(name.lexeme, base, {
+                method.name.lexeme: GeneratorFunction(closure, method, False)
+                if body is None else CompiledFunction(
+                    closure, method, method.name.lexeme == 'init', body)
+                for method, body in methods}))
+
+        return _class
+
+    def visit_let_stmt(self, stmt):
+        initializer = self.compile(stmt.initializer) if stmt.initializer else None
+        name = stmt.name.lexeme
+
+        if initializer is None:
+            return lambda env: env.define(name, None)
+
+        return lambda env: env.define(name, initializer(env))
+
+    def visit_expression_stmt(self, stmt):
+        expression = self.compile(stmt.expression)
+
+        def _expression(env):
+            expression(env)
+
+        return _expression
+
+    def visit_while_stmt(self, stmt):
+        condition = self.compile(stmt.condition)
+        body = self.compile(stmt.body)
+
+        def _while(env):
+            while condition(env):
+                if (signal := body(env)) is not None:
+                    return signal
+
+        return _while
+
+    def visit_return_stmt(self, stmt):
+        if stmt.tail:
+            return self.compile_tail_call(stmt.value)
+
+        value = self.compile(stmt.value) if stmt.value else None
+
+        def _return(env):
+            return ReturnValue(value(env) if value else None)
+
+        return _return
+
+    def visit_yield_stmt(self, stmt):
+        keyword = stmt.keyword
+
+        def _yield(env):
+            raise RuntimeError(keyword, 'can only yield from a generator')
+
+        return _yield
+
+    def compile_tail_call(self, expr):
+        callee = self.compile(expr.callee)
+        arguments = [self.compile(argument) for argument in expr.arguments]
+        interpreter = self.interpreter
+        paren = expr.paren
+
+        def _tail_call(env):
+            function = callee(env)
+            values = [argument(env) for argument in arguments]
+
+            if not isinstance(function, PoxCallable):
+                raise RuntimeError(paren, 'can only call functions and classes')
+
+            interpreter.check_arity(function, values, paren)
+            return TailCall(function, values, paren)
+
+        return _tail_call
+
+class CompilingInterpreter(Interpreter):
+    def interpret(self, stmts, pox):
+        program = Compiler(self).compile_block(stmts)
+
+        try:
+            program(self.globals)
+        except RuntimeError as err:
+            self.output.flush()
+            pox.report_error(err)
+        finally:
+            self.output.flush()
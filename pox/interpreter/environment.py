@@ -10,14 +10,6 @@ class Environment:
     def define(self, name, value): # name: str
         self.values[name] = value
 
-    def ancestor(self, distance):
-        environment = self
-
-        for _ in range(distance):
-            environment = environment.enclosing
-
-        return environment
-
     def get(self, name): # name: Token
         if name.lexeme in self.values:
             return self.values[name.lexeme]
@@ -27,9 +19,6 @@ class Environment:
 
         raise RuntimeError(name, f'undefined variable {name.lexeme}')
 
-    def get_at(self, distance, name): # name: str
-        return self.ancestor(distance).values[name]
-
     def assign(self, name, value):
         if name.lexeme in self.values:
             return self.values.update({name.lexeme: value})
@@ -39,5 +28,29 @@ class Environment:
 
         raise RuntimeError(name, f'undefined variable {name.lexeme}')
 
-    def assign_at(self, distance, name, value):
-        self.ancestor(distance).values.update({name.lexeme: value})
+# local scopes are array backed, the resolver hands out a slot index to
+# every local in the order they are declared, which is also the order
+# they get defined in at runtime, so `define` only needs to append
+class Frame:
+    __slots__ = ('values', 'enclosing')
+
+    def __init__(self, enclosing, values=None):
+        self.values = [] if values is None else values
+        self.enclosing = enclosing
+
+    def define(self, _, value):
+        self.values.append(value)
+
+    def ancestor(self, distance):
+        environment = self
+
+        for _ in range(distance):
+            environment = environment.enclosing
+
+        return environment
+
+    def get_at(self, distance, slot):
+        return self.ancestor(distance).values[slot]
+
+    def assign_at(self, distance, slot, value):
+        self.ancestor(distance).values[slot] = value
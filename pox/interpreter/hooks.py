@@ -0,0 +1,136 @@
+# coding: utf-8
+
+import sys
+
+from collections import Counter
+
+from pox.parser import Stmt
+
+from .interpreter import Interpreter
+
+# the hooks are only ever called by `TracingInterpreter`, which is used in
+# place of `Interpreter` when they're asked for, so running a program without
+# them doesn't go through any of this
+class Hooks:
+    def statement(self, stmt):
+        pass
+
+    def expression(self, expr):
+        pass
+
+    def environment(self, env):
+        pass
+
+    def call(self, function, arguments):
+        pass
+
+    # a call made in place of the one returning it, no `ret` follows
+    def tail_call(self, function, arguments):
+        pass
+
+    def ret(self, function, value):
+        pass
+
+class Counters(Hooks):
+    def __init__(self):
+        self.nodes = Counter()
+        self.functions = Counter()
+        self.environments = 0
+        self.calls = 0
+        self.depth = 0
+        self.max_depth = 0
+
+    def statement(self, stmt):
+        self.nodes[type(stmt)] += 1
+
+    def expression(self, expr):
+        self.nodes[type(expr)] += 1
+
+    def environment(self, env):
+        self.environments += 1
+
+    def call(self, function, arguments):
+        self.calls += 1
+        self.functions[str(function)] += 1
+        self.depth += 1
+        self.max_depth = max(self.max_depth, self.depth)
+
+    def tail_call(self, function, arguments):
+        self.calls += 1
+        self.functions[str(function)] += 1
+
+    def ret(self, function, value):
+        self.depth -= 1
+
+    def report(self, file=sys.stderr):
+        stmts = {t: n for t, n in self.nodes.items() if issubclass(t, Stmt)}
+        exprs = {t: n for t, n in self.nodes.items() if t not in stmts}
+
+        print('stats:', file=file)
+        print(f'  {sum(stmts.values()):>12}  statements', file=file)
+        print(f'  {sum(exprs.values()):>12}  expressions', file=file)
+        print(f'  {self.environments:>12}  environments', file=file)
+        print(f'  {self.calls:>12}  calls (max depth {self.max_depth})', file=file)
+
+        for title, counts in [('statements', stmts), ('expressions', exprs)]:
+            print(f'{title}:', file=file)
+
+            for node, n in sorted(counts.items(), key=lambda kv: -kv[1]):
+                print(f'  {n:>12}  {node.__name__}', file=file)
+
+        print('calls:', file=file)
+
+        for name, n in self.functions.most_common(10):
+            print(f'  {n:>12}  {name}', file=file)
+
+class TracingInterpreter(Interpreter):
+    def __init__(self, hooks, **options):
+        super().__init__(**options)
+        self.hooks = hooks
+
+    def evaluate(self, expr):
+        self.hooks.expression(expr)
+        return expr.accept(self)
+
+    def execute(self, stmt):
+        self.hooks.statement(stmt)
+        return stmt.accept(self)
+
+    def execute_block(self, stmts, env):
+        self.hooks.environment(env)
+        return super().execute_block(stmts, env)
+
+    def visit_class_stmt(self, stmt):
+        if stmt.superclass:
+            # the frame holding `super` for the methods
+            self.hooks.environment(None)
+
+        return super().visit_class_stmt(stmt)
+
+    # every call goes through `call` so that all of them reach the hooks,
+    # which means skipping the shortcuts the call sites take otherwise
+    def visit_call_expr(self, expr):
+        function  = self.evaluate(expr.callee)
+        arguments = list(map(self.evaluate, expr.arguments))
+
+        return self.call(function, arguments, expr.paren)
+
+    def tail_call(self, expr):
+        self.hooks.expression(expr)
+        signal = super().tail_call(expr)
+        self.hooks.tail_call(signal.function, signal.arguments)
+
+        return signal
+
+    # a call that raises still returns as far as the hooks are concerned,
+    # with nothing, or the depth would never come back down
+    def call(self, function, arguments, paren):
+        self.hooks.call(function, arguments)
+        value = None
+
+        try:
+            value = super().call(function, arguments, paren)
+        finally:
+            self.hooks.ret(function, value)
+
+        return value
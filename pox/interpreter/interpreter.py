@@ -1,24 +1,38 @@
 # coding: utf-8
 
-from pox.error import RuntimeError
+from pox.error import NativeError, RuntimeError
 from pox.utils import number, stringify
 
 from pox.scanner import TokenType
 from pox.parser import ExprVisitor, StmtVisitor
+from pox.parser.exprs import Assign, Get, Variable
 
 from .native import init_native_functions
 from .callable import *
-from .environment import Environment
+from .cache import NO_METHOD, InlineCache, CountingInlineCache
+from .environment import Environment, Frame
+from .output import Output
+
+# stands in for a global that isn't defined, `nil` is a value like any other
+UNDEFINED = object()
 
 def check_number_operands(operator, *operands):
     if not number(*operands):
         raise RuntimeError(operator, 'operands must be numbers')
 
 class Interpreter(ExprVisitor, StmtVisitor):
-    def __init__(self):
+    def __init__(self, cache_stats=False):
         self.locals = {}
         self.globals = Environment()
         self.environment = self.globals
+        self.output = Output()
+
+        # source of every program run so far, for the natives that run
+        # functions of it somewhere else
+        self.sources = []
+
+        # every inline cache gets registered here when `cache_stats` is set
+        self.caches = [] if cache_stats else None
 
         init_native_functions(self)
 
@@ -30,10 +44,18 @@ class Interpreter(ExprVisitor, StmtVisitor):
             for stmt in stmts:
                 self.execute(stmt)
         except RuntimeError as err:
+            self.output.flush()
             pox.report_error(err)
+        finally:
+            self.output.flush()
+
+    def resolve(self, expr, depth, slot):
+        self.locals[expr] = (depth, slot)
 
-    def resolve(self, expr, depth):
-        self.locals[expr] = depth
+        # variables and assignments keep theirs on the node as well, where
+        # reading it doesn't take a lookup in `locals`
+        if type(expr) is Variable or type(expr) is Assign:
+            expr.depth, expr.slot = depth, slot
 
     def execute(self, stmt):
         return stmt.accept(self)
@@ -45,14 +67,23 @@ class Interpreter(ExprVisitor, StmtVisitor):
             self.environment = env
 
             for stmt in stmts.statements:
-                if stmt:
-                    self.execute(stmt)
+                if stmt and (signal := self.execute(stmt)) is not None:
+                    return signal
         finally:
             self.environment = previous
 
+    def site_cache(self, expr, kind, token):
+        if self.caches is None:
+            expr.cache = InlineCache()
+        else:
+            expr.cache = CountingInlineCache(kind, token)
+            self.caches.append(expr.cache)
+
+        return expr.cache
+
     def look_up_variable(self, name, expr):
-        if (distance := self.locals.get(expr)) is not None:
-            return self.environment.get_at(distance, name.lexeme)
+        if (local := self.locals.get(expr)) is not None:
+            return self.environment.get_at(*local)
 
         return self.globals.get(name)
 
@@ -89,13 +120,34 @@ class Interpreter(ExprVisitor, StmtVisitor):
     def visit_grouping_expr(self, expr):
         return self.evaluate(expr.expression)
 
+    def get_property(self, object, name):
+        if isinstance(object, PoxInstance):
+            return object.get(name)
+
+        raise RuntimeError(name, 'only instances have properties')
+
     def visit_get_expr(self, expr):
         object = self.evaluate(expr.object)
 
-        if isinstance(object, PoxInstance):
-            return object.get(expr.name)
+        if type(object) is not PoxInstance:
+            return self.get_property(object, expr.name)
+
+        name = expr.name.lexeme
+
+        # a field is read without looking at the cache at all
+        if name in object.fields:
+            return object.fields[name]
+
+        cache = expr.cache or self.site_cache(expr, 'get', expr.name)
+
+        if (method := cache.lookup(object.pclass)) is None:
+            method = object.pclass.find_method(name) or NO_METHOD
+            cache.update(object.pclass, method)
+
+        if method is NO_METHOD:
+            raise RuntimeError(expr.name, f'undefined property \'{name}\'')
 
-        raise RuntimeError(expr.name, 'only instances have properties')
+        return method.bind(object)
 
     def visit_literal_expr(self, expr):
         return expr.value
@@ -122,10 +174,10 @@ class Interpreter(ExprVisitor, StmtVisitor):
         return value
 
     def visit_super_expr(self, expr):
-        distance = self.locals.get(expr)
+        distance, slot = self.locals.get(expr)
 
-        superclass = self.environment.get_at(distance, 'super')
-        object = self.environment.get_at(distance - 1, 'this')
+        superclass = self.environment.get_at(distance, slot)
+        object = self.environment.get_at(distance - 1, 0)
 
         if method := superclass.find_method(expr.method.lexeme):
             return method.bind(object)
@@ -145,34 +197,114 @@ class Interpreter(ExprVisitor, StmtVisitor):
                 check_number_operands(expr.op, right)
                 return -right
 
+    def check_arity(self, function, arguments, paren):
+        if len(arguments) != function.arity():
+            raise RuntimeError(
+                paren,
+                f'expected {function.arity()} arguments but got {len(arguments)}')
+
+    def call(self, function, arguments, paren):
+        if not isinstance(function, PoxCallable):
+            raise RuntimeError(paren, 'can only call functions and classes')
+
+        self.check_arity(function, arguments, paren)
+
+        try:
+            return function.call(self, arguments)
+        except NativeError as err:
+            raise RuntimeError(paren, err.message)
+
     def visit_call_expr(self, expr):
+        if type(expr.callee) is Get:
+            return self.invoke(expr)
+
         function  = self.evaluate(expr.callee)
         arguments = list(map(self.evaluate, expr.arguments))
 
-        if not isinstance(function, PoxCallable):
-            raise RuntimeError(expr.paren, 'can only call functions and classes')
+        cache = expr.cache or self.site_cache(
+            expr, 'call',
+            expr.callee.name if type(expr.callee) is Variable else expr.paren)
 
-        if len(arguments) != function.arity():
-            raise RuntimeError(
-                expr.paren,
-                f'expected {function.arity()} arguments but got {len(arguments)}')
+        # the number of arguments is fixed per site, so a callee that passed
+        # the checks once can be called directly from then on
+        if cache.lookup(function) is None:
+            if not isinstance(function, PoxCallable):
+                raise RuntimeError(expr.paren, 'can only call functions and classes')
+
+            self.check_arity(function, arguments, expr.paren)
+            cache.update(function, True)
 
-        return function.call(self, arguments)
+        try:
+            return function.call(self, arguments)
+        except NativeError as err:
+            raise RuntimeError(expr.paren, err.message)
+
+    def invoke(self, expr):
+        object = self.evaluate(expr.callee.object)
+        name = expr.callee.name.lexeme
+
+        # `object.method(...)` calls the method straight from the class
+        # table without binding it to the instance first, native classes
+        # like `list` included
+        if isinstance(object, PoxInstance):
+            cache = expr.cache or self.site_cache(expr, 'invoke', expr.callee.name)
+
+            if (method := cache.lookup(object.pclass)) is None:
+                method = object.pclass.find_method(name)
 
+                if method is None or method.arity() != len(expr.arguments):
+                    method = NO_METHOD
+
+                cache.update(object.pclass, method)
+
+            if method is not NO_METHOD and name not in object.fields:
+                arguments = list(map(self.evaluate, expr.arguments))
+
+                try:
+                    return method.invoke(self, object, arguments)
+                except NativeError as err:
+                    raise RuntimeError(expr.paren, err.message)
+
+        function = self.get_property(object, expr.callee.name)
+        arguments = list(map(self.evaluate, expr.arguments))
+
+        return self.call(function, arguments, expr.paren)
+
+    # most locals are in the innermost frame or the one around it, those
+    # are read without going through `Frame.ancestor`
     def visit_variable_expr(self, expr):
-        return self.look_up_variable(expr.name, expr)
+        if (depth := expr.depth) == 0:
+            return self.environment.values[expr.slot]
 
-    def visit_assign_expr(self, expr):
-        value = self.evaluate(expr.value)
+        if depth == 1:
+            return self.environment.enclosing.values[expr.slot]
 
-        if (distance := self.locals.get(expr)) is not None:
-            return self.environment.assign_at(distance, expr.name, value) or value
+        if depth is None:
+            if (value := self.globals.values.get(expr.name.lexeme, UNDEFINED)) is UNDEFINED:
+                return self.globals.get(expr.name)
 
-        return self.globals.assign(expr.name, value) or value
+            return value
+
+        return self.environment.get_at(depth, expr.slot)
+
+    def visit_assign_expr(self, expr):
+        return self.assign(expr, self.evaluate(expr.value))
+
+    def assign(self, expr, value):
+        if (depth := expr.depth) == 0:
+            self.environment.values[expr.slot] = value
+        elif depth == 1:
+            self.environment.enclosing.values[expr.slot] = value
+        elif depth is None:
+            self.globals.assign(expr.name, value)
+        else:
+            self.environment.assign_at(depth, expr.slot, value)
+
+        return value
 
     def visit_function_stmt(self, stmt):
-        self.environment.define(
-            stmt.name.lexeme, PoxFunction(self.environment, stmt, False))
+        function = GeneratorFunction if stmt.generator else PoxFunction
+        self.environment.define(stmt.name.lexeme, function(self.environment, stmt, False))
 
     def visit_if_stmt(self, stmt):
         for cond, branch in stmt.branches:
@@ -180,10 +312,10 @@ class Interpreter(ExprVisitor, StmtVisitor):
                 return self.execute(branch)
 
         if stmt.else_branch is not None:
-            self.execute(stmt.else_branch)
+            return self.execute(stmt.else_branch)
 
     def visit_block_stmt(self, stmt):
-        self.execute_block(stmt, Environment(self.environment))
+        return self.execute_block(stmt, Frame(self.environment))
 
     def visit_class_stmt(self, stmt):
         if superclass := stmt.superclass:
@@ -193,23 +325,20 @@ class Interpreter(ExprVisitor, StmtVisitor):
                 raise RuntimeError(
                     stmt.superclass.name, '`superclass` must be a class')
 
-        self.environment.define(stmt.name.lexeme, None)
-
         if stmt.superclass:
-            self.environment = Environment(self.environment)
-            self.environment.define('super', superclass)
+            self.environment = Frame(self.environment, [superclass])
 
         methods = {}
         for method in stmt.methods:
             name = method.name.lexeme
-            methods.update({
-                name: PoxFunction(self.environment, method, name == 'init')})
+            function = GeneratorFunction if method.generator else PoxFunction
+            methods.update({name: function(self.environment, method, name == 'init')})
 
         if stmt.superclass:
             self.environment = self.environment.enclosing
 
-        self.environment.assign(
-            stmt.name, PoxClass(stmt.name.lexeme, superclass, methods))
+        self.environment.define(
+            stmt.name.lexeme, PoxClass(stmt.name.lexeme, superclass, methods))
 
     def visit_let_stmt(self, stmt):
         self.environment.define(
@@ -221,7 +350,25 @@ class Interpreter(ExprVisitor, StmtVisitor):
 
     def visit_while_stmt(self, stmt):
         while bool(self.evaluate(stmt.condition)):
-            self.execute(stmt.body)
+            if (signal := self.execute(stmt.body)) is not None:
+                return signal
 
     def visit_return_stmt(self, stmt):
-        raise ReturnException(self.evaluate(stmt.value) if stmt.value else None)
+        if stmt.tail:
+            return self.tail_call(stmt.value)
+
+        return ReturnValue(self.evaluate(stmt.value) if stmt.value else None)
+
+    # the bodies of generators run on a `StackInterpreter`, never through here
+    def visit_yield_stmt(self, stmt):
+        raise RuntimeError(stmt.keyword, 'can only yield from a generator')
+
+    def tail_call(self, expr):
+        function  = self.evaluate(expr.callee)
+        arguments = list(map(self.evaluate, expr.arguments))
+
+        if not isinstance(function, PoxCallable):
+            raise RuntimeError(expr.paren, 'can only call functions and classes')
+
+        self.check_arity(function, arguments, expr.paren)
+        return TailCall(function, arguments, expr.paren)
@@ -3,8 +3,12 @@
 import sys
 import time
 
+from array import array
+from collections import OrderedDict
+
+from pox.error import NativeError
 from pox.utils import stringify
-from pox.interpreter.callable import PoxCallable, PoxClass, PoxInstance
+from pox.interpreter.callable import BoundMethod, PoxCallable, PoxClass, PoxInstance
 
 class NativeFunction(PoxCallable):
     name = None
@@ -24,8 +28,8 @@ class PRINT(NativeFunction):
     def arity(self):
         return 1
 
-    def call(self, _, arguments):
-        print(stringify(arguments[0]), end='')
+    def call(self, interpreter, arguments):
+        interpreter.output.write(stringify(arguments[0]))
 
 class PRINTLN(NativeFunction):
     name = 'println'
@@ -33,8 +37,27 @@ class PRINTLN(NativeFunction):
     def arity(self):
         return 1
 
-    def call(self, _, arguments):
-        print(stringify(arguments[0]))
+    def call(self, interpreter, arguments):
+        interpreter.output.write(f'{stringify(arguments[0])}\n')
+
+class WRITE(NativeFunction):
+    name = 'write'
+
+    def arity(self):
+        return 1
+
+    def call(self, interpreter, arguments):
+        if isinstance(arguments[0], str):
+            interpreter.output.write(arguments[0])
+
+class FLUSH(NativeFunction):
+    name = 'flush'
+
+    def arity(self):
+        return 0
+
+    def call(self, interpreter, _):
+        interpreter.output.flush()
 
 class INPUT(NativeFunction):
     name = 'input'
@@ -42,7 +65,10 @@ class INPUT(NativeFunction):
     def arity(self):
         return 1
 
-    def call(self, _, arguments):
+    def call(self, interpreter, arguments):
+        # the prompt has to show up after whatever was printed before it
+        interpreter.output.flush()
+
         try:
             return input(arguments[0])
         except EOFError:
@@ -163,26 +189,27 @@ class EXIT(NativeFunction):
     def arity(self):
         return 1
 
-    def call(self, _, arguments):
+    def call(self, interpreter, arguments):
+        interpreter.output.flush()
         sys.exit(arguments[0])
 
-def list_fn_wrapper(self, fn):
-    def _fn(*args, **kwargs):
-        try:
-            return fn(self, *args, **kwargs)
-        except:
-            return False
+# methods of the native classes, shared by all of their instances through
+# the class table. `fn` gets the instance and the arguments, errors python
+# raises on bad arguments (a missing index, a wrong type, a number that
+# doesn't fit) turn into `nil`. the class table of a pox class inheriting
+# from a native one has them too, but its instances are plain instances
+# without the data they work on, `kind` is what they do work on
+class NativeMethod(PoxCallable):
+    errors = (IndexError, TypeError, ValueError, OverflowError)
 
-    return _fn
-
-class ListFn(PoxCallable):
-    def __init__(self, name, arity, list):
+    def __init__(self, name, arity, fn):
         self.name = name
-        self.list = list
+        self.fn = fn
+        self.kind = PoxInstance
         self._arity = arity
 
     def __str__(self):
-        return f'<fn {self.name}>'
+        return f'<native fn {self.name}>'
 
     def arity(self):
         return self._arity
@@ -190,39 +217,371 @@ class ListFn(PoxCallable):
     def call(self, *_):
         pass
 
-class ListInstance(PoxInstance):
-    functions = [
-        (1, 'get', lambda s, _, a: s.list.data[a[0]]),
-        (1, 'add', lambda s, _, a: s.list.data.append(a[0])),
-        (1, 'pop', lambda s, _, a: s.list.data.pop(a[0])),
-        (2, 'set', lambda s, _, a: s.list.data.__setitem__(*a)),
-        (0, 'len', lambda s,   *_: len(s.list.data))]
+    def invoke(self, interpreter, instance, arguments):
+        if not isinstance(instance, self.kind):
+            raise NativeError(f'can\'t call native method {self.name} on {instance}')
 
-    def __init__(self, pclass):
-        self.data = []
-        self.func = {}
+        try:
+            return self.run(interpreter, instance, arguments)
+        except self.errors:
+            return None
+
+    def run(self, interpreter, instance, arguments):
+        return self.fn(instance, *arguments)
+
+    def bind(self, instance):
+        return BoundMethod(instance, self)
+
+# for methods that also need the interpreter, it's passed ahead of the instance
+class InterpreterMethod(NativeMethod):
+    def run(self, interpreter, instance, arguments):
+        return self.fn(interpreter, instance, *arguments)
 
-        for (a, n, c) in self.functions:
-            self.func[n] = ListFn(n, a, self)
-            self.func[n].call = list_fn_wrapper(self.func[n], c)
+def native_methods(kind, *methods):
+    for method in methods:
+        method.kind = kind
 
+    return {method.name: method for method in methods}
+
+class ListInstance(PoxInstance):
+    def __init__(self, pclass, data=None):
+        super().__init__(pclass)
+        self.data = [] if data is None else data
+
+class ListIterator(PoxInstance):
+    def __init__(self, pclass, data):
         super().__init__(pclass)
+        self.data = data
+        self.index = 0
+
+def list_next(it):
+    if it.index < len(it.data):
+        it.index += 1
+        return it.data[it.index - 1]
+
+def list_extend(xs, other):
+    if not isinstance(other, ListInstance):
+        raise TypeError
+
+    xs.data.extend(other.data)
+
+def list_fill(xs, value, n):
+    xs.data[:] = [value] * n
+
+def list_sort(xs):
+    # `sorted` leaves the list alone when the values can't be compared
+    xs.data[:] = sorted(xs.data)
+
+LIST_ITERATOR = PoxClass('list_iterator', None, native_methods(
+    ListIterator,
+    NativeMethod('next', 0, list_next),
+    NativeMethod('done', 0, lambda it: it.index >= len(it.data))))
+
+# a suspended pox function. the engines fill in `resume`, which runs the body
+# up to its next `yield` and returns the `Yielded` it stopped at, or `None`
+# once the body is done. `done` has to know whether there's a next value, so
+# it runs the body that far and `next` hands out the value it stopped at
+class GeneratorInstance(PoxInstance):
+    def __init__(self, pclass, function):
+        super().__init__(pclass)
+        self.function = function
+        self.pending = None
+        self.running = False
+        self.finished = False
+
+    def __str__(self):
+        return f'<generator {self.function}>'
 
-    def get(self, name):
-        if fn := self.func.get(name.lexeme):
-            return fn
+    def advance(self):
+        if self.pending is not None or self.finished:
+            return
 
-        return super().get(name)
+        # a generator asking itself for its next value
+        if self.running:
+            raise NativeError('the generator is already running')
+
+        self.running = True
+
+        try:
+            self.pending = self.resume()
+        finally:
+            self.running = False
+            self.finished = self.pending is None
+
+def generator_next(gen):
+    gen.advance()
+
+    if (pending := gen.pending) is not None:
+        gen.pending = None
+        return pending.value
+
+# these run pox code, whatever goes wrong in there is an error of the program
+class GeneratorMethod(NativeMethod):
+    errors = ()
+
+GENERATOR = PoxClass('generator', None, native_methods(
+    GeneratorInstance,
+    GeneratorMethod('next', 0, generator_next),
+    GeneratorMethod('done', 0, lambda gen: gen.advance() or gen.finished)))
+
+LIST_METHODS = native_methods(
+    ListInstance,
+    NativeMethod('get',     1, lambda xs, i: xs.data[i]),
+    NativeMethod('set',     2, lambda xs, i, v: xs.data.__setitem__(i, v)),
+    NativeMethod('add',     1, lambda xs, v: xs.data.append(v)),
+    NativeMethod('pop',     1, lambda xs, i: xs.data.pop(i)),
+    NativeMethod('len',     0, lambda xs: len(xs.data)),
+    NativeMethod('insert',  2, lambda xs, i, v: xs.data.insert(i, v)),
+    NativeMethod('index',   1, lambda xs, v: xs.data.index(v)),
+    NativeMethod('extend',  1, list_extend),
+    NativeMethod('slice',   2, lambda xs, i, j: ListInstance(xs.pclass, xs.data[i:j])),
+    NativeMethod('fill',    2, list_fill),
+    NativeMethod('sort',    0, list_sort),
+    NativeMethod('reverse', 0, lambda xs: xs.data.reverse()),
+    NativeMethod('join',    1, lambda xs, sep: str.join(sep, map(stringify, xs.data))),
+    NativeMethod('iter',    0, lambda xs: ListIterator(LIST_ITERATOR, xs.data)))
 
 class LIST(PoxClass):
     def __init__(self):
-        super().__init__('list', None, {})
+        super().__init__('list', None, LIST_METHODS)
 
     def call(self, *_):
         return ListInstance(self)
 
+class StrBufInstance(PoxInstance):
+    def __init__(self, pclass):
+        super().__init__(pclass)
+        self.parts = []
+        self.size = 0
+
+def strbuf_append(buf, value, end=''):
+    string = f'{stringify(value)}{end}'
+    buf.parts.append(string)
+    buf.size += len(string)
+
+def strbuf_build(buf):
+    # joined once, building it again without appending reuses the result
+    string = ''.join(buf.parts)
+    buf.parts[:] = [string] if string else []
+
+    return string
+
+def strbuf_clear(buf):
+    buf.parts.clear()
+    buf.size = 0
+
+STRBUF_METHODS = native_methods(
+    StrBufInstance,
+    NativeMethod('append',      1, strbuf_append),
+    NativeMethod('append_line', 1, lambda buf, value: strbuf_append(buf, value, '\n')),
+    NativeMethod('len',         0, lambda buf: buf.size),
+    NativeMethod('build',       0, strbuf_build),
+    NativeMethod('clear',       0, strbuf_clear))
+
+class STRBUF(PoxClass):
+    def __init__(self):
+        super().__init__('strbuf', None, STRBUF_METHODS)
+
+    def call(self, *_):
+        return StrBufInstance(self)
+
+# keys are compared like `==` compares them in pox, instances (lists and
+# maps included) by identity
+class MapInstance(PoxInstance):
+    def __init__(self, pclass):
+        super().__init__(pclass)
+        self.data = {}
+
+def map_set(m, key, value):
+    m.data[key] = value
+
+MAP_METHODS = native_methods(
+    MapInstance,
+    NativeMethod('get',    1, lambda m, key: m.data.get(key)),
+    NativeMethod('set',    2, map_set),
+    NativeMethod('has',    1, lambda m, key: key in m.data),
+    NativeMethod('delete', 1, lambda m, key: m.data.pop(key, None)),
+    NativeMethod('keys',   0, lambda m: ListInstance(CLASSES['list'], list(m.data))),
+    NativeMethod('values', 0, lambda m: ListInstance(CLASSES['list'], list(m.data.values()))),
+    NativeMethod('len',    0, lambda m: len(m.data)))
+
+class MAP(PoxClass):
+    def __init__(self):
+        super().__init__('map', None, MAP_METHODS)
+
+    def call(self, *_):
+        return MapInstance(self)
+
+class JOIN(NativeFunction):
+    name = 'join'
+
+    def arity(self):
+        return 2
+
+    def call(self, _, arguments):
+        xs, sep = arguments
+
+        if isinstance(xs, ListInstance) and isinstance(sep, str):
+            return sep.join(map(stringify, xs.data))
+
+# element types of `buffer`, the values are `array` type codes
+BUFFER_KINDS = {
+    'u8': 'B', 'i8': 'b', 'u16': 'H', 'i16': 'h', 'u32': 'I', 'i32': 'i',
+    'u64': 'Q', 'i64': 'q', 'f32': 'f', 'f64': 'd'}
+
+class BufferInstance(PoxInstance):
+    def __init__(self, pclass, kind, data):
+        super().__init__(pclass)
+        self.kind = kind
+        self.data = data
+
+def buffer_fill(buf, value):
+    buf.data[:] = array(buf.data.typecode, [value]) * len(buf.data)
+
+def buffer_write(interpreter, buf, path):
+    try:
+        if path is None:
+            output = interpreter.output
+            # an output replaced with a text only stream has no bytes to take
+            if (stdout := getattr(output.file, 'buffer', None)) is None:
+                raise NativeError('can\'t write a buffer to the output, it only takes text')
+
+            output.flush()
+            stdout.write(buf.data.tobytes())
+            stdout.flush()
+        else:
+            with open(path, 'wb') as file:
+                buf.data.tofile(file)
+    except OSError:
+        return None
+
+    return True
+
+BUFFER_METHODS = native_methods(
+    BufferInstance,
+    NativeMethod('get',   1, lambda buf, i: buf.data[i]),
+    NativeMethod('set',   2, lambda buf, i, v: buf.data.__setitem__(i, v)),
+    NativeMethod('len',   0, lambda buf: len(buf.data)),
+    NativeMethod('fill',  1, buffer_fill),
+    NativeMethod('slice', 2, lambda buf, i, j: BufferInstance(buf.pclass, buf.kind, buf.data[i:j])),
+    NativeMethod('kind',  0, lambda buf: buf.kind),
+    InterpreterMethod('write', 1, buffer_write))
+
+class BUFFER(PoxClass):
+    def __init__(self):
+        super().__init__('buffer', None, BUFFER_METHODS)
+
+    def arity(self):
+        return 2
+
+    def call(self, _, arguments):
+        kind, n = arguments
+
+        if kind not in BUFFER_KINDS or not isinstance(n, int) or n < 0:
+            return None
+
+        # zeroed without going through a python list of `n` items
+        data = array(BUFFER_KINDS[kind])
+        data.frombytes(bytes(data.itemsize * n))
+
+        return BufferInstance(self, kind, data)
+
+# only calls whose arguments are all plain values are cached, the type is
+# part of the key so that `1`, `1.0` and `true` don't share an entry
+MEMO_KEY_TYPES = frozenset([type(None), bool, int, float, str])
+
+class MemoFunction(PoxInstance, PoxCallable):
+    def __init__(self, pclass, function, size):
+        super().__init__(pclass)
+        self.function = function
+        self.size = size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __str__(self):
+        return f'<memo {self.function}>'
+
+    def arity(self):
+        return self.function.arity()
+
+    def call(self, interpreter, arguments):
+        if not all(type(argument) in MEMO_KEY_TYPES for argument in arguments):
+            self.misses += 1
+            return self.function.call(interpreter, arguments)
+
+        key = tuple((type(argument), argument) for argument in arguments)
+
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        self.misses += 1
+        value = self.cache[key] = self.function.call(interpreter, arguments)
+
+        if self.size is not None and len(self.cache) > self.size:
+            self.cache.popitem(last=False)
+            self.evictions += 1
+
+        return value
+
+def memo_stats(fn):
+    stats = MapInstance(CLASSES['map'])
+    stats.data.update(
+        hits=fn.hits, misses=fn.misses, evictions=fn.evictions, size=len(fn.cache))
+
+    return stats
+
+MEMO_CLASS = PoxClass('memo', None, native_methods(
+    MemoFunction,
+    NativeMethod('stats', 0, memo_stats),
+    NativeMethod('clear', 0, lambda fn: fn.cache.clear())))
+
+class PARALLEL_MAP(NativeFunction):
+    name = 'parallel_map'
+
+    def arity(self):
+        return 2
+
+    def call(self, interpreter, arguments):
+        from .parallel import parallel_map
+        return parallel_map(interpreter, *arguments)
+
+class PARALLEL_RANGE(NativeFunction):
+    name = 'parallel_range'
+
+    def arity(self):
+        return 3
+
+    def call(self, interpreter, arguments):
+        from .parallel import parallel_range
+        return parallel_range(interpreter, *arguments)
+
+class MEMO(NativeFunction):
+    name = 'memo'
+
+    def arity(self):
+        return 2
+
+    def call(self, _, arguments):
+        function, size = arguments
+
+        if not isinstance(function, PoxCallable):
+            return None
+
+        if size is not None and (type(size) is not int or size < 1):
+            return None
+
+        return MemoFunction(MEMO_CLASS, function, size)
+
+# the native classes keep no state of their own, every interpreter shares them
+CLASSES = {pclass.name: pclass for pclass in [LIST(), BUFFER(), STRBUF(), MAP()]}
+
 def init_native_functions(interpreter):
     for function in NativeFunction.__subclasses__():
         interpreter.globals.define(function.name, function())
 
-    interpreter.globals.define('list', LIST())
+    for name, pclass in CLASSES.items():
+        interpreter.globals.define(name, pclass)
@@ -0,0 +1,30 @@
+# coding: utf-8
+
+import sys
+
+# everything a program prints goes through here. writes are collected and
+# handed to the file in one go once there's `limit` characters of them, or
+# on every new line when a terminal is watching. the engines flush whatever
+# is left when a program ends, fails or calls `exit`
+class Output:
+    def __init__(self, file=None, limit=1 << 16):
+        self.file = file or sys.stdout
+        self.limit = limit
+        self.interactive = self.file.isatty()
+        self.chunks = []
+        self.size = 0
+
+    def write(self, text):
+        self.chunks.append(text)
+        self.size += len(text)
+
+        if self.size >= self.limit or self.interactive and '\n' in text:
+            self.flush()
+
+    def flush(self):
+        if self.chunks:
+            self.file.write(''.join(self.chunks))
+            self.chunks.clear()
+            self.size = 0
+
+        self.file.flush()
@@ -0,0 +1,162 @@
+# coding: utf-8
+
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from pox.error import NativeError, RuntimeError
+from pox.utils import stringify
+
+from .callable import PoxCallable
+from .native import CLASSES, ListInstance
+
+# `parallel_map` and `parallel_range` run a function of the program on a
+# pool of processes. every worker runs the top-level function and class
+# declarations of the program once when it starts (and nothing else of it),
+# then gets sent the name of the function with chunks of arguments, along
+# with the current values of the top-level variables. only plain values
+# make it across: numbers, strings, booleans, nil and lists
+PLAIN = frozenset([type(None), bool, int, float, str])
+
+def to_wire(value):
+    if type(value) in PLAIN:
+        return value
+
+    if isinstance(value, ListInstance):
+        return [to_wire(item) for item in value.data]
+
+    raise NativeError(
+        f'can\'t send {stringify(value)} to or from a worker, only numbers, '
+        'strings, booleans, nil and lists of those')
+
+def from_wire(value):
+    if type(value) is list:
+        return ListInstance(CLASSES['list'], [from_wire(item) for item in value])
+
+    return value
+
+# the top-level variables that can be sent, the others (functions, classes,
+# instances) are either declared by the workers themselves or left out
+def wire_globals(interpreter):
+    values = {}
+
+    for name, value in interpreter.globals.values.items():
+        if type(value) in PLAIN or isinstance(value, ListInstance):
+            try:
+                values[name] = to_wire(value)
+            except NativeError:
+                pass
+
+    return values
+
+# the interpreter of a worker process
+worker = None
+
+def start_worker(sources):
+    global worker
+
+    from pox.__main__ import Pox
+    from pox.parser.stmts import Class, Function
+    from .interpreter import Interpreter
+
+    pox = Pox()
+    worker = Interpreter()
+    worker.sources = list(sources)
+
+    for source in sources:
+        statements, locals = pox.compile(source)
+
+        for expr, (depth, slot) in locals.items():
+            worker.resolve(expr, depth, slot)
+
+        worker.interpret([stmt for stmt in statements if type(stmt) in (Function, Class)], pox)
+
+def run_chunk(name, values, items):
+    if (function := worker.globals.values.get(name)) is None:
+        raise NativeError(f'{name} isn\'t declared at the top level of the program')
+
+    for key, value in values.items():
+        worker.globals.values[key] = from_wire(value)
+
+    try:
+        return [to_wire(function.call(worker, [from_wire(item)])) for item in items]
+    except RuntimeError as err:
+        raise NativeError(f'{err.message}, on line {err.token.line} in a worker')
+    except NativeError:
+        raise
+    # anything else would reach the program as a python exception
+    except Exception as err:
+        raise NativeError(f'{type(err).__name__}: {err}, in a worker')
+    finally:
+        worker.output.flush()
+
+def run_range(name, values, start, end):
+    return run_chunk(name, values, range(start, end))
+
+pool = None
+pool_sources = None
+
+def workers(sources):
+    global pool, pool_sources
+
+    # a program run later in the same interpreter (in the repl) can declare
+    # more functions, workers started before it don't know about them
+    if pool is None or pool_sources != sources:
+        if pool is not None:
+            pool.shutdown()
+
+        pool = ProcessPoolExecutor(initializer=start_worker, initargs=(tuple(sources),))
+        pool_sources = list(sources)
+
+    return pool
+
+def global_name(interpreter, function):
+    for name, value in interpreter.globals.values.items():
+        if value is function:
+            return name
+
+    raise NativeError('only functions declared at the top level can run in parallel')
+
+def chunk_size(n):
+    return max(1, n // ((os.cpu_count() or 1) * 4))
+
+def run(interpreter, function, tasks, *arguments):
+    global pool
+
+    if not isinstance(function, PoxCallable) or function.arity() != 1:
+        raise NativeError('a function run in parallel takes exactly one argument')
+
+    name = global_name(interpreter, function)
+    values = wire_globals(interpreter)
+
+    # forked workers would inherit whatever is still waiting to be printed
+    interpreter.output.flush()
+
+    try:
+        chunks = workers(interpreter.sources).map(
+            tasks, [name] * len(arguments[0]), [values] * len(arguments[0]), *arguments)
+
+        return ListInstance(
+            CLASSES['list'], [from_wire(value) for chunk in chunks for value in chunk])
+    except BrokenProcessPool:
+        pool = None
+        raise NativeError('a worker process died')
+
+def parallel_map(interpreter, function, items):
+    if not isinstance(items, ListInstance):
+        raise NativeError('parallel_map takes a list')
+
+    data = [to_wire(item) for item in items.data]
+    n = chunk_size(len(data))
+
+    return run(interpreter, function, run_chunk, [data[i:i + n] for i in range(0, len(data), n)])
+
+def parallel_range(interpreter, function, start, end):
+    if type(start) is not int or type(end) is not int:
+        raise NativeError('parallel_range takes whole numbers')
+
+    n = chunk_size(end - start)
+    starts = range(start, end, n)
+
+    return run(interpreter, function, run_range, starts, [min(i + n, end) for i in starts])
@@ -0,0 +1,192 @@
+# coding: utf-8
+
+import sys
+import time
+
+from pox.scanner import Token
+from pox.parser import Expr, Stmt
+
+from .callable import PoxCallable, PoxFunction, PoxClass
+from .interpreter import Interpreter
+from .hooks import TracingInterpreter
+from .native import NativeFunction, NativeMethod
+
+# deterministic profiler built on `sys.setprofile`, nothing is hooked unless
+# a program is run through `Profiler.run`. the python calls it looks for are
+# the ones every engine goes through to run pox code: `call` and `invoke` of
+# the callables for functions, methods, classes and natives, `tail_call` of
+# functions for the tail calls, and (for the tree walker) `Interpreter.execute`
+# for the line of every statement
+
+ROOT = '<script>'
+EXECUTE = {Interpreter.execute.__code__, TracingInterpreter.execute.__code__}
+CALLS = ('call', 'invoke', 'tail_call')
+
+def first_line(node):
+    match node:
+        case Token():
+            return node.line
+        case Expr() | Stmt():
+            fields = (getattr(node, field) for field in node.__slots__)
+        case list() | tuple():
+            fields = node
+        case _:
+            return None
+
+    for field in fields:
+        if (line := first_line(field)) is not None:
+            return line
+
+def describe(key):
+    match key:
+        case (pclass, method):
+            # named after the class defining the method, not the receiver's
+            while method not in pclass.methods.values() and pclass.superclass:
+                pclass = pclass.superclass
+
+            name = method.declaration.name
+            return f'{pclass.name}.{name.lexeme}:{name.line}'
+        case Stmt():
+            return f'{key.name.lexeme}:{key.name.line}'
+        case _:
+            return key.name
+
+class Entry:
+    __slots__ = ('frame', 'key', 'start', 'children', 'path')
+
+    def __init__(self, frame, key, start, path=None):
+        self.frame = frame
+        self.key = key
+        self.start = start
+        self.children = 0
+        self.path = path
+
+class Profiler:
+    def __init__(self):
+        self.names = {}
+        self.lines = {}
+
+        self.functions = {}
+        self.statements = {}
+        self.stacks = {}
+
+        self.calls = []
+        self.executing = []
+
+        self.active = {}
+        self.elapsed = 0
+
+    def run(self, fn, *args):
+        start = time.perf_counter_ns()
+        self.calls.append(Entry(None, ROOT, start, (ROOT,)))
+        self.active[ROOT] = 1
+
+        sys.setprofile(self.hook)
+
+        try:
+            return fn(*args)
+        finally:
+            sys.setprofile(None)
+            now = time.perf_counter_ns()
+
+            while self.executing:
+                self.leave(self.executing, self.statements, now)
+
+            while self.calls:
+                self.leave(self.calls, self.functions, now)
+
+            self.elapsed += now - start
+
+    def name(self, callable, locals):
+        match callable:
+            case PoxFunction() if locals.get('instance') is not None:
+                key = (locals['instance'].pclass, callable)
+            case PoxFunction():
+                key = callable.declaration
+            case NativeFunction():
+                key = type(callable)
+            case NativeMethod():
+                key = callable
+            case PoxClass():
+                key = callable
+            case _:
+                return None
+
+        if (name := self.names.get(key)) is None:
+            name = self.names[key] = describe(key)
+
+        return name
+
+    def line(self, stmt):
+        if (line := self.lines.get(stmt)) is None:
+            line = self.lines[stmt] = first_line(stmt) or 0
+
+        return line
+
+    def hook(self, frame, event, _):
+        if event == 'call':
+            code = frame.f_code
+
+            if code in EXECUTE:
+                stmt = frame.f_locals['stmt']
+                self.enter(self.executing, frame, self.line(stmt))
+            elif code.co_name in CALLS and isinstance(
+                    callable := frame.f_locals.get('self'), PoxCallable):
+                if name := self.name(callable, frame.f_locals):
+                    entry = self.enter(self.calls, frame, name)
+                    entry.path = self.calls[-2].path + (name,)
+
+        elif event == 'return':
+            if self.executing and self.executing[-1].frame is frame:
+                self.leave(self.executing, self.statements, time.perf_counter_ns())
+            elif self.calls and self.calls[-1].frame is frame:
+                self.leave(self.calls, self.functions, time.perf_counter_ns())
+
+    def enter(self, stack, frame, key):
+        self.active[key] = self.active.get(key, 0) + 1
+        stack.append(entry := Entry(frame, key, time.perf_counter_ns()))
+
+        return entry
+
+    def leave(self, stack, stats, now):
+        entry = stack.pop()
+        total = now - entry.start
+
+        if stack:
+            stack[-1].children += total
+
+        # [calls, total, self], recursive activations only count once in total
+        stat = stats.get(entry.key) or stats.setdefault(entry.key, [0, 0, 0])
+        stat[0] += 1
+        stat[2] += total - entry.children
+
+        self.active[entry.key] -= 1
+
+        if not self.active[entry.key]:
+            stat[1] += total
+
+        if entry.path is not None:
+            self.stacks[entry.path] = self.stacks.get(entry.path, 0) + total - entry.children
+
+    def report(self, file=sys.stderr, limit=25):
+        calls = sum(stat[0] for key, stat in self.functions.items() if key != ROOT)
+        print(f'profile: {self.elapsed / 1e9:.3f}s, {calls} calls', file=file)
+
+        self.table(file, 'calls', 'function', self.functions, limit)
+
+        if self.statements:
+            self.table(file, 'hits', 'line', self.statements, limit)
+
+    def table(self, file, count, name, stats, limit):
+        print(f'{count:>10}  {"total ms":>10}  {"self ms":>10}  {name}', file=file)
+
+        for key, (n, total, own) in sorted(stats.items(), key=lambda kv: -kv[1][2])[:limit]:
+            print(f'{n:>10}  {total / 1e6:>10.3f}  {own / 1e6:>10.3f}  {key}', file=file)
+
+    # one `frame;frame;frame microseconds` line per distinct stack, the format
+    # flamegraph.pl, speedscope and inferno take
+    def write_collapsed(self, path):
+        with open(path, 'w') as file:
+            for stack, ns in sorted(self.stacks.items()):
+                if ns >= 1000:
+                    print(f'{";".join(stack)} {ns // 1000}', file=file)
@@ -0,0 +1,260 @@
+# coding: utf-8
+
+from types import GeneratorType
+
+from pox.error import NativeError, RuntimeError
+from pox.scanner import TokenType
+from pox.parser.optimizer import binary, unary
+
+from .callable import *
+from .environment import Frame
+from .interpreter import Interpreter
+from .native import GENERATOR, GeneratorInstance
+
+# deepest a pox call chain gets before it's stopped with a runtime error,
+# for the engines keeping their own stack
+MAX_DEPTH = 100_000
+
+# a tree walker that doesn't recurse in python. the visitors of nodes with
+# children are generators that `yield` a child to have it evaluated and are
+# sent back its value, `run` keeps the suspended ones on a list of its own.
+# pox calls run their body the same way, so how deep a program recurses is
+# only bounded by memory and by `max_depth`, which tail calls don't count
+# towards. leaves, and nodes without any children that need evaluating, go
+# through the visitors of `Interpreter`
+class StackInterpreter(Interpreter):
+    def __init__(self, max_depth=MAX_DEPTH, **options):
+        super().__init__(**options)
+        self.max_depth = max_depth
+        self.depth = 0
+
+    def evaluate(self, expr):
+        return self.run(expr)
+
+    def execute(self, stmt):
+        return self.run(stmt)
+
+    def run(self, node):
+        if type(value := node.accept(self)) is not GeneratorType:
+            return value
+
+        return self.drive([value])
+
+    # runs the visitors on `stack` until it's empty and returns the value of
+    # the last one, or until one of them yields and returns its `Yielded`
+    # with the stack left as it is, to be driven on from there later
+    def drive(self, stack):
+        value = None
+
+        try:
+            while stack:
+                try:
+                    node = stack[-1].send(value)
+                except StopIteration as stop:
+                    stack.pop()
+                    value = stop.value
+                    continue
+
+                if type(node) is Yielded:
+                    return node
+
+                if type(value := node.accept(self)) is GeneratorType:
+                    stack.append(value)
+                    value = None
+        except BaseException:
+            # lets the suspended visitors put back the environment
+            for visitor in reversed(stack):
+                visitor.close()
+
+            stack.clear()
+            raise
+
+        return value
+
+    def call_function(self, function, arguments, paren):
+        match function:
+            case GeneratorFunction() | BoundMethod(method=GeneratorFunction()):
+                return function.call(self, arguments)
+            case PoxClass() if type(function) is PoxClass:
+                instance = PoxInstance(function)
+
+                if init := function.find_method('init'):
+                    yield from self.run_function(init, [instance, *arguments], paren)
+
+                return instance
+            case BoundMethod(method=PoxFunction(initializer=True) as method):
+                yield from self.run_function(method, [function.receiver, *arguments], paren)
+                return function.receiver
+            case BoundMethod(method=PoxFunction() as method):
+                return (yield from self.run_function(
+                    method, [function.receiver, *arguments], paren))
+            case PoxFunction():
+                return (yield from self.run_function(function, list(arguments), paren))
+            case _:
+                try:
+                    return function.call(self, arguments)
+                except NativeError as err:
+                    raise RuntimeError(paren, err.message)
+
+    def run_function(self, function, values, paren):
+        if self.depth >= self.max_depth:
+            raise RuntimeError(paren, f'stack overflow, more than {self.max_depth} calls deep')
+
+        previous = self.environment
+        self.depth += 1
+
+        try:
+            while True:
+                self.environment = Frame(function.closure, values)
+                signal = None
+
+                for stmt in function.declaration.body.statements:
+                    if stmt and (signal := (yield stmt)) is not None:
+                        break
+
+                if type(signal) is not TailCall:
+                    return signal.value if signal else None
+
+                # a tail call to a pox function takes over this activation
+                match signal.function:
+                    case GeneratorFunction() | BoundMethod(method=GeneratorFunction()):
+                        return signal.function.call(self, signal.arguments)
+                    case PoxFunction(initializer=False):
+                        function, values = signal.function, list(signal.arguments)
+                    case BoundMethod(method=PoxFunction(initializer=False) as method):
+                        function, values = method, [signal.function.receiver, *signal.arguments]
+                    case _:
+                        return (yield from self.call_function(
+                            signal.function, signal.arguments, signal.paren))
+        finally:
+            self.environment = previous
+            self.depth -= 1
+
+    # the body of a generator, a `return` in it is the end of the generator
+    def run_generator(self, statements):
+        for stmt in statements:
+            if stmt and (yield stmt) is not None:
+                return
+
+    def visit_binary_expr(self, expr):
+        lt = yield expr.lt
+        rt = yield expr.rt
+
+        return binary(expr.op, lt, rt)
+
+    def visit_grouping_expr(self, expr):
+        return (yield expr.expression)
+
+    def visit_get_expr(self, expr):
+        return self.get_property((yield expr.object), expr.name)
+
+    def visit_logical_expr(self, expr):
+        lt = yield expr.lt
+
+        if expr.op.type == TokenType.OR:
+            if bool(lt): return lt
+        else:
+            if not bool(lt): return lt
+
+        return (yield expr.rt)
+
+    def visit_set_expr(self, expr):
+        object = yield expr.object
+
+        if not isinstance(object, PoxInstance):
+            raise RuntimeError(expr.name, 'only instances have fields')
+
+        value = yield expr.value
+        object.set(expr.name, value)
+
+        return value
+
+    def visit_unary_expr(self, expr):
+        return unary(expr.op, (yield expr.expression))
+
+    def visit_call_expr(self, expr):
+        function = yield expr.callee
+        arguments = []
+
+        for argument in expr.arguments:
+            arguments.append((yield argument))
+
+        if not isinstance(function, PoxCallable):
+            raise RuntimeError(expr.paren, 'can only call functions and classes')
+
+        self.check_arity(function, arguments, expr.paren)
+        return (yield from self.call_function(function, arguments, expr.paren))
+
+    def visit_assign_expr(self, expr):
+        return self.assign(expr, (yield expr.value))
+
+    def visit_if_stmt(self, stmt):
+        for cond, branch in stmt.branches:
+            if bool((yield cond)):
+                return (yield branch)
+
+        if stmt.else_branch is not None:
+            return (yield stmt.else_branch)
+
+    def visit_block_stmt(self, stmt):
+        previous = self.environment
+        self.environment = Frame(previous)
+
+        try:
+            for statement in stmt.statements:
+                if statement and (signal := (yield statement)) is not None:
+                    return signal
+        finally:
+            self.environment = previous
+
+    def visit_let_stmt(self, stmt):
+        value = (yield stmt.initializer) if stmt.initializer else None
+        self.environment.define(stmt.name.lexeme, value)
+
+    def visit_expression_stmt(self, stmt):
+        yield stmt.expression
+
+    def visit_while_stmt(self, stmt):
+        while bool((yield stmt.condition)):
+            if (signal := (yield stmt.body)) is not None:
+                return signal
+
+    def visit_return_stmt(self, stmt):
+        if not stmt.tail:
+            return ReturnValue((yield stmt.value) if stmt.value else None)
+
+        function = yield stmt.value.callee
+        arguments = []
+
+        for argument in stmt.value.arguments:
+            arguments.append((yield argument))
+
+        if not isinstance(function, PoxCallable):
+            raise RuntimeError(stmt.value.paren, 'can only call functions and classes')
+
+        self.check_arity(function, arguments, stmt.value.paren)
+        return TailCall(function, arguments, stmt.value.paren)
+
+    # the `Yielded` goes up to `drive`, which hands it to the generator's
+    # caller. resuming the generator sends `None` back in here
+    def visit_yield_stmt(self, stmt):
+        yield Yielded((yield stmt.value) if stmt.value else None)
+
+class PoxGenerator(GeneratorInstance):
+    def __init__(self, interpreter, function, values):
+        super().__init__(GENERATOR, function)
+
+        # a walker of its own sharing everything but the environment with the
+        # interpreter, what the body is up to stays on it and on `stack`
+        # while it's suspended
+        self.walker = walker = StackInterpreter.__new__(StackInterpreter)
+        walker.__dict__.update(vars(interpreter))
+        walker.max_depth = getattr(interpreter, 'max_depth', MAX_DEPTH)
+        walker.depth = 0
+        walker.environment = Frame(function.closure, values)
+
+        self.stack = [walker.run_generator(function.declaration.body.statements)]
+
+    def resume(self):
+        if type(signal := self.walker.drive(self.stack)) is Yielded:
+            return signal
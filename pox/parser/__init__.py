@@ -3,4 +3,5 @@
 from .exprs import Expr, ExprVisitor
 from .stmts import Stmt, StmtVisitor
 from .parser import Parser, ParseError
-from .resolver import Resolver
+from .resolver import Resolver, Locals
+from .optimizer import Optimizer
@@ -3,7 +3,7 @@
 from abc import ABC, abstractmethod
 
 class Expr:
-    pass
+    __slots__ = ()
 
 class ExprVisitor(ABC):
     @abstractmethod
@@ -55,14 +55,20 @@ class ExprVisitor(ABC):
         pass
 
 class Assign(Expr):
-    def __init__(self, name, value):
+    __slots__ = ('name', 'value', 'depth', 'slot')
+
+    def __init__(self, name, value, depth=None, slot=None):
         self.name = name
         self.value = value
+        self.depth = depth
+        self.slot = slot
 
     def accept(self, visitor):
         return visitor.visit_assign_expr(self)
 
 class Binary(Expr):
+    __slots__ = ('lt', 'op', 'rt')
+
     def __init__(self, lt, op, rt):
         self.lt = lt
         self.op = op
@@ -72,15 +78,20 @@ class Binary(Expr):
         return visitor.visit_binary_expr(self)
 
 class Call(Expr):
-    def __init__(self, callee, paren, arguments):
+    __slots__ = ('callee', 'paren', 'arguments', 'cache')
+
+    def __init__(self, callee, paren, arguments, cache=None):
         self.callee = callee
         self.paren = paren
         self.arguments = arguments
+        self.cache = cache
 
     def accept(self, visitor):
         return visitor.visit_call_expr(self)
 
 class Grouping(Expr):
+    __slots__ = ('expression',)
+
     def __init__(self, expression):
         self.expression = expression
 
@@ -88,14 +99,19 @@ class Grouping(Expr):
         return visitor.visit_grouping_expr(self)
 
 class Get(Expr):
-    def __init__(self, object, name):
+    __slots__ = ('object', 'name', 'cache')
+
+    def __init__(self, object, name, cache=None):
         self.object = object
         self.name = name
+        self.cache = cache
 
     def accept(self, visitor):
         return visitor.visit_get_expr(self)
 
 class Literal(Expr):
+    __slots__ = ('value',)
+
     def __init__(self, value):
         self.value = value
 
@@ -103,6 +119,8 @@ class Literal(Expr):
         return visitor.visit_literal_expr(self)
 
 class Logical(Expr):
+    __slots__ = ('lt', 'op', 'rt')
+
     def __init__(self, lt, op, rt):
         self.lt = lt
         self.op = op
@@ -112,6 +130,8 @@ class Logical(Expr):
         return visitor.visit_logical_expr(self)
 
 class Set(Expr):
+    __slots__ = ('object', 'name', 'value')
+
     def __init__(self, object, name, value):
         self.object = object
         self.name = name
@@ -121,6 +141,8 @@ class Set(Expr):
         return visitor.visit_set_expr(self)
 
 class Super(Expr):
+    __slots__ = ('keyword', 'method')
+
     def __init__(self, keyword, method):
         self.keyword = keyword
         self.method = method
@@ -129,6 +151,8 @@ class Super(Expr):
         return visitor.visit_super_expr(self)
 
 class This(Expr):
+    __slots__ = ('keyword',)
+
     def __init__(self, keyword):
         self.keyword = keyword
 
@@ -136,6 +160,8 @@ class This(Expr):
         return visitor.visit_this_expr(self)
 
 class Unary(Expr):
+    __slots__ = ('op', 'expression')
+
     def __init__(self, op, expression):
         self.op = op
         self.expression = expression
@@ -144,8 +170,12 @@ class Unary(Expr):
         return visitor.visit_unary_expr(self)
 
 class Variable(Expr):
-    def __init__(self, name):
+    __slots__ = ('name', 'depth', 'slot')
+
+    def __init__(self, name, depth=None, slot=None):
         self.name = name
+        self.depth = depth
+        self.slot = slot
 
     def accept(self, visitor):
         return visitor.visit_variable_expr(self)
@@ -0,0 +1,235 @@
+# coding: utf-8
+
+from pox.parser.exprs import *
+from pox.parser.stmts import *
+from pox.scanner import TokenType
+from pox.error import RuntimeError
+from pox.utils import number, stringify
+
+# runs between the resolver and the interpreter. operations on literals are
+# folded following the same rules the interpreter applies at runtime, the ones
+# that would fail are left alone so the error is still raised if they run.
+# branches and loops whose condition is a literal are dropped, together with
+# whatever the resolver recorded in `locals` for the names inside of them
+
+def binary(op, lt, rt):
+    if op.type not in [TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL, TokenType.PLUS]:
+        if not number(lt, rt):
+            raise RuntimeError(op, 'operands must be numbers')
+
+    match op.type:
+        case TokenType.MINUS:         return lt  - rt
+        case TokenType.STAR:          return lt  * rt
+        case TokenType.LESS:          return lt  < rt
+        case TokenType.GREATER:       return lt  > rt
+        case TokenType.LESS_EQUAL:    return lt <= rt
+        case TokenType.GREATER_EQUAL: return lt >= rt
+        case TokenType.EQUAL_EQUAL:   return lt == rt
+        case TokenType.BANG_EQUAL:    return not (lt == rt)
+        case TokenType.SLASH:
+            if rt == 0:
+                raise RuntimeError(op, 'division by zero')
+
+            return lt  / rt
+        case TokenType.PLUS:
+            try:
+                if isinstance(lt, str) or isinstance(rt, str):
+                    return f'{stringify(lt)}{stringify(rt)}'
+
+                return lt + rt
+            except TypeError:
+                raise RuntimeError(op, 'operands must be numbers or strings')
+
+def unary(op, right):
+    match op.type:
+        case TokenType.BANG:
+            return not bool(right)
+        case TokenType.MINUS:
+            if not number(right):
+                raise RuntimeError(op, 'operands must be numbers')
+
+            return -right
+
+def literal(expr):
+    return type(expr) is Literal
+
+class Optimizer(ExprVisitor, StmtVisitor):
+    def __init__(self, locals):
+        self.locals = locals
+
+        self.folded = 0
+        self.pruned = 0
+
+    def optimize(self, stmts):
+        return [stmt for stmt in map(self.statement, stmts) if stmt]
+
+    def statement(self, stmt):
+        return stmt.accept(self) if stmt else None
+
+    def expression(self, expr):
+        return expr.accept(self)
+
+    def body(self, stmt):
+        # a loop or a branch still needs something to run
+        return self.statement(stmt) or Block([])
+
+    def fold(self, expr, fn, *args):
+        try:
+            value = fn(*args)
+        except RuntimeError:
+            return expr
+
+        self.folded += 1
+        return Literal(value)
+
+    def discard(self, *nodes):
+        for node in nodes:
+            match node:
+                case Expr() | Stmt():
+                    self.locals.forget(node)
+                    self.discard(*(getattr(node, field) for field in node.__slots__))
+                case list() | tuple():
+                    self.discard(*node)
+
+    def visit_assign_expr(self, expr):
+        expr.value = self.expression(expr.value)
+        return expr
+
+    def visit_binary_expr(self, expr):
+        expr.lt = self.expression(expr.lt)
+        expr.rt = self.expression(expr.rt)
+
+        if literal(expr.lt) and literal(expr.rt):
+            return self.fold(expr, binary, expr.op, expr.lt.value, expr.rt.value)
+
+        return expr
+
+    def visit_call_expr(self, expr):
+        expr.callee = self.expression(expr.callee)
+        expr.arguments = [self.expression(argument) for argument in expr.arguments]
+        return expr
+
+    # only there for the parser, dropping one isn't counted as a fold
+    def visit_grouping_expr(self, expr):
+        return self.expression(expr.expression)
+
+    def visit_get_expr(self, expr):
+        expr.object = self.expression(expr.object)
+        return expr
+
+    def visit_literal_expr(self, expr):
+        return expr
+
+    def visit_logical_expr(self, expr):
+        expr.lt = self.expression(expr.lt)
+        expr.rt = self.expression(expr.rt)
+
+        if not literal(expr.lt):
+            return expr
+
+        self.folded += 1
+
+        if bool(expr.lt.value) == (expr.op.type == TokenType.OR):
+            self.discard(expr.rt)
+            return expr.lt
+
+        return expr.rt
+
+    def visit_set_expr(self, expr):
+        expr.object = self.expression(expr.object)
+        expr.value = self.expression(expr.value)
+        return expr
+
+    def visit_super_expr(self, expr):
+        return expr
+
+    def visit_this_expr(self, expr):
+        return expr
+
+    def visit_unary_expr(self, expr):
+        expr.expression = self.expression(expr.expression)
+
+        if literal(expr.expression):
+            return self.fold(expr, unary, expr.op, expr.expression.value)
+
+        return expr
+
+    def visit_variable_expr(self, expr):
+        return expr
+
+    def visit_block_stmt(self, stmt):
+        stmt.statements = self.optimize(stmt.statements)
+        return stmt
+
+    def visit_class_stmt(self, stmt):
+        for method in stmt.methods:
+            self.statement(method)
+
+        return stmt
+
+    def visit_expression_stmt(self, stmt):
+        stmt.expression = self.expression(stmt.expression)
+        return stmt
+
+    def visit_function_stmt(self, stmt):
+        stmt.body.statements = self.optimize(stmt.body.statements)
+        return stmt
+
+    def visit_if_stmt(self, stmt):
+        branches = []
+        else_branch = stmt.else_branch
+
+        for i, (cond, branch) in enumerate(stmt.branches):
+            cond = self.expression(cond)
+
+            if not literal(cond):
+                branches.append((cond, self.body(branch)))
+            elif not cond.value:
+                self.pruned += 1
+                self.discard(branch)
+            else:
+                # nothing after the first branch that's always taken can run
+                self.pruned += len(stmt.branches) - i - 1 + bool(else_branch)
+                self.discard(stmt.branches[i + 1:], else_branch)
+
+                else_branch = branch
+                break
+
+        else_branch = self.statement(else_branch)
+
+        if not branches:
+            return else_branch
+
+        stmt.branches = branches
+        stmt.else_branch = else_branch
+
+        return stmt
+
+    def visit_return_stmt(self, stmt):
+        if stmt.value:
+            stmt.value = self.expression(stmt.value)
+
+        return stmt
+
+    def visit_yield_stmt(self, stmt):
+        if stmt.value:
+            stmt.value = self.expression(stmt.value)
+
+        return stmt
+
+    def visit_let_stmt(self, stmt):
+        if stmt.initializer:
+            stmt.initializer = self.expression(stmt.initializer)
+
+        return stmt
+
+    def visit_while_stmt(self, stmt):
+        stmt.condition = self.expression(stmt.condition)
+
+        if literal(stmt.condition) and not stmt.condition.value:
+            self.pruned += 1
+            self.discard(stmt.body)
+            return None
+
+        stmt.body = self.body(stmt.body)
+        return stmt
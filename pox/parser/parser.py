@@ -8,28 +8,31 @@ from pox.parser.stmts import *
 
 SYNC_TOKENS = [
     TokenType.IF, TokenType.FOR, TokenType.LET,
-    TokenType.FN, TokenType.WHILE, TokenType.CLASS, TokenType.RETURN]
+    TokenType.FN, TokenType.WHILE, TokenType.CLASS, TokenType.RETURN, TokenType.YIELD]
 
 class Parser:
-    current = 0
-
+    # the grammar never looks further than one token in either direction,
+    # so any iterable of tokens ending with `EOF` works, including a scanner
+    # that's producing them as they're consumed
     def __init__(self, tokens):
-        self.tokens = tokens
+        self.tokens = iter(tokens)
+        self.prev = None
+        self.next = next(self.tokens)
 
     def peek(self):
-        return self.tokens[self.current]
+        return self.next
 
     def is_at_end(self):
-        return self.peek().type == TokenType.EOF
+        return self.next.type == TokenType.EOF
 
     def previous(self):
-        return self.tokens[self.current - 1]
+        return self.prev
 
     def advance(self):
         if not self.is_at_end():
-            self.current += 1
+            self.prev, self.next = self.next, next(self.tokens)
 
-        return self.previous()
+        return self.prev
 
     def check(self, t):
         if self.is_at_end():
@@ -132,6 +135,7 @@ class Parser:
         if self.match(TokenType.FOR): return self.for_statement()
         if self.match(TokenType.RETURN): return self.return_statement()
         if self.match(TokenType.WHILE): return self.while_statement()
+        if self.match(TokenType.YIELD): return self.yield_statement()
         if self.match(TokenType.LEFT_BRACE): return self.block_statement()
 
         return self.expression_statement()
@@ -175,6 +179,16 @@ class Parser:
         self.consume(TokenType.SEMICOLON, 'expect \';\' after return value')
         return Return(keyword, value)
 
+    def yield_statement(self):
+        value = None
+        keyword = self.previous()
+
+        if not self.check(TokenType.SEMICOLON):
+            value = self.expression()
+
+        self.consume(TokenType.SEMICOLON, 'expect \';\' after yield value')
+        return Yield(keyword, value)
+
     def for_statement(self):
         self.consume(TokenType.LEFT_PAREN, 'expect \'(\' after for')
 
@@ -185,7 +199,7 @@ class Parser:
         condition = Literal(True) if self.check(TokenType.SEMICOLON) else self.expression()
         self.consume(TokenType.SEMICOLON, 'expect \';\' after loop condition')
 
-        increment = None if self.check(TokenType.RIGHT_PAREN) else self.expression()
+        increment = None if self.check(TokenType.RIGHT_PAREN) else Expression(self.expression())
         self.consume(TokenType.RIGHT_PAREN, 'expect \')\' after for clauses')
 
         return Block([
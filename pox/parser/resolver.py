@@ -17,15 +17,29 @@ class ClassType(Enum):
     CLASS = auto()
     SUBCLASS = auto()
 
+# what the resolver found for local names, kept apart from the interpreter
+# so that it can be cached with the tree and handed to any of the engines
+class Locals(dict):
+    def resolve(self, expr, depth, slot):
+        self[expr] = (depth, slot)
+
+    def forget(self, expr):
+        self.pop(expr, None)
+
 class Resolver(ExprVisitor, StmtVisitor):
-    def __init__(self, pox, interpreter):
+    def __init__(self, pox, locals):
         self.scopes = []
 
         self.curr_fn = FunctionType.NONE
         self.curr_cl = ClassType.NONE
 
+        # the declaration being resolved and its `return`s with a value,
+        # which a function only turns out not to allow once it yields
+        self.curr_def = None
+        self.returns = []
+
         self.pox = pox
-        self.interpreter = interpreter
+        self.locals = locals
 
     def resolve(self, *args):
         for n in args:
@@ -34,20 +48,34 @@ class Resolver(ExprVisitor, StmtVisitor):
     def resolve_local(self, expr, name):
         for i in range(0, len(self.scopes))[::-1]:
             if name.lexeme in self.scopes[i]:
-                return self.interpreter.resolve(expr, len(self.scopes) - 1 - i)
+                return self.locals.resolve(
+                    expr, len(self.scopes) - 1 - i, self.scopes[i][name.lexeme][1])
 
     def resolve_function(self, function, fn_type):
         enclosing_fn = self.curr_fn
+        enclosing_def = self.curr_def, self.returns
+
         self.curr_fn = fn_type
+        self.curr_def, self.returns = function, []
         self.begin_scope()
 
+        if fn_type in (FunctionType.METHOD, FunctionType.INITIALIZER):
+            self.scopes[-1].update({'this': (True, 0)})
+
         for param in function.params:
             self.declare(param)
             self.define(param)
 
         self.resolve(*function.body.statements)
         self.end_scope()
+
+        if function.generator:
+            for stmt in self.returns:
+                self.pox.report_error(
+                    ResolveError(stmt.keyword, 'can\'t return a value from a generator'))
+
         self.curr_fn = enclosing_fn
+        self.curr_def, self.returns = enclosing_def
 
     def begin_scope(self):
         self.scopes.append({})
@@ -59,17 +87,21 @@ class Resolver(ExprVisitor, StmtVisitor):
         if not self.scopes:
             return None
 
-        if name.lexeme in self.scopes[-1]:
+        scope = self.scopes[-1]
+        if name.lexeme in scope:
             self.pox.report_error(
                 ResolveError(name, 'there already is a variable with this name in this scope'))
 
-        self.scopes[-1][name.lexeme] = False
+        # names map to whether they're defined yet and the index their value
+        # is stored at in the runtime frame, which is the declaration order
+        scope[name.lexeme] = (False, scope.get(name.lexeme, (False, len(scope)))[1])
 
     def define(self, name):
         if not self.scopes:
             return None
 
-        self.scopes[-1][name.lexeme] = True
+        scope = self.scopes[-1]
+        scope[name.lexeme] = (True, scope[name.lexeme][1])
 
     def visit_binary_expr(self, expr):
         self.resolve(expr.lt)
@@ -119,7 +151,7 @@ class Resolver(ExprVisitor, StmtVisitor):
         self.resolve(expr.expression)
 
     def visit_variable_expr(self, expr):
-        if self.scopes and self.scopes[-1].get(expr.name.lexeme) == False:
+        if self.scopes and self.scopes[-1].get(expr.name.lexeme, (True,))[0] == False:
             self.pox.report_error(
                 ResolveError(expr.name, 'can\'t read local variable in its own initializer'))
 
@@ -151,10 +183,7 @@ class Resolver(ExprVisitor, StmtVisitor):
             self.resolve(stmt.superclass)
 
             self.begin_scope()
-            self.scopes[-1].update({'super': True})
-
-        self.begin_scope()
-        self.scopes[-1].update({'this': True})
+            self.scopes[-1].update({'super': (True, 0)})
 
         for method in stmt.methods:
             self.resolve_function(
@@ -163,8 +192,6 @@ class Resolver(ExprVisitor, StmtVisitor):
 
         if stmt.superclass:
             self.end_scope()
-
-        self.end_scope()
         self.curr_cl = enclosing_cl
 
     def visit_let_stmt(self, stmt):
@@ -202,8 +229,27 @@ class Resolver(ExprVisitor, StmtVisitor):
                 ResolveError(stmt.keyword, 'can\'t return from an initializer'))
 
         if stmt.value:
+            self.returns.append(stmt)
             self.resolve(stmt.value)
 
+        # the function is done once the call returns, so the engines can make
+        # it in place of the current one instead of on top of it
+        stmt.tail = type(stmt.value) is Call and self.curr_fn != FunctionType.NONE
+
     def visit_while_stmt(self, stmt):
         self.resolve(stmt.condition)
         self.resolve(stmt.body)
+
+    def visit_yield_stmt(self, stmt):
+        if self.curr_fn == FunctionType.NONE:
+            self.pox.report_error(
+                ResolveError(stmt.keyword, 'can\'t yield from top-level code'))
+        elif self.curr_fn == FunctionType.INITIALIZER:
+            self.pox.report_error(
+                ResolveError(stmt.keyword, 'can\'t yield from an initializer'))
+        else:
+            # calling the function makes a generator instead of running it
+            self.curr_def.generator = True
+
+        if stmt.value:
+            self.resolve(stmt.value)
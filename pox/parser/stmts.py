@@ -3,7 +3,7 @@
 from abc import ABC, abstractmethod
 
 class Stmt:
-    pass
+    __slots__ = ()
 
 class StmtVisitor(ABC):
     @abstractmethod
@@ -38,7 +38,13 @@ class StmtVisitor(ABC):
     def visit_while_stmt(self, stmt):
         pass
 
+    @abstractmethod
+    def visit_yield_stmt(self, stmt):
+        pass
+
 class Block(Stmt):
+    __slots__ = ('statements',)
+
     def __init__(self, statements):
         self.statements = statements
 
@@ -46,6 +52,8 @@ class Block(Stmt):
         return visitor.visit_block_stmt(self)
 
 class Class(Stmt):
+    __slots__ = ('name', 'superclass', 'methods')
+
     def __init__(self, name, superclass, methods):
         self.name = name
         self.superclass = superclass
@@ -55,6 +63,8 @@ class Class(Stmt):
         return visitor.visit_class_stmt(self)
 
 class Expression(Stmt):
+    __slots__ = ('expression',)
+
     def __init__(self, expression):
         self.expression = expression
 
@@ -62,15 +72,20 @@ class Expression(Stmt):
         return visitor.visit_expression_stmt(self)
 
 class Function(Stmt):
-    def __init__(self, name, params, body):
+    __slots__ = ('name', 'params', 'body', 'generator')
+
+    def __init__(self, name, params, body, generator=False):
         self.name = name
         self.params = params
         self.body = body
+        self.generator = generator
 
     def accept(self, visitor):
         return visitor.visit_function_stmt(self)
 
 class If(Stmt):
+    __slots__ = ('branches', 'else_branch')
+
     def __init__(self, branches, else_branch):
         self.branches = branches
         self.else_branch = else_branch
@@ -79,14 +94,19 @@ class If(Stmt):
         return visitor.visit_if_stmt(self)
 
 class Return(Stmt):
-    def __init__(self, keyword, value):
+    __slots__ = ('keyword', 'value', 'tail')
+
+    def __init__(self, keyword, value, tail=False):
         self.keyword = keyword
         self.value = value
+        self.tail = tail
 
     def accept(self, visitor):
         return visitor.visit_return_stmt(self)
 
 class Let(Stmt):
+    __slots__ = ('name', 'initializer')
+
     def __init__(self, name, initializer):
         self.name = name
         self.initializer = initializer
@@ -95,9 +115,21 @@ class Let(Stmt):
         return visitor.visit_let_stmt(self)
 
 class While(Stmt):
+    __slots__ = ('condition', 'body')
+
     def __init__(self, condition, body):
         self.condition = condition
         self.body = body
 
     def accept(self, visitor):
         return visitor.visit_while_stmt(self)
+
+class Yield(Stmt):
+    __slots__ = ('keyword', 'value')
+
+    def __init__(self, keyword, value):
+        self.keyword = keyword
+        self.value = value
+
+    def accept(self, visitor):
+        return visitor.visit_yield_stmt(self)
@@ -1,9 +1,38 @@
 # coding: utf-8
 
+import re
+import sys
+
 from pox.error import ScannerError, build_syntax_error
 from pox.utils import decode_escapes
 from pox.scanner.token import Token, TokenType, RESERVED_KEYWORDS
 
+# the fast path only takes tokens it can be sure about, anything else (errors,
+# strings with escapes in them, non-ascii names) is left for `scan_token` to
+# scan one character at a time
+TOKEN_PATTERN = re.compile(r'''[ \t\r]*(?:
+    (?P<identifier>[A-Za-z_][A-Za-z0-9_]*)(?![A-Za-z0-9_]|[^\x00-\x7f])
+  | (?P<operator>[!=<>]=|/(?![*/])|[(){},.+\-*;=!<>])
+  | (?P<space>\n[ \t\r\n]*)
+  | (?P<number>[0-9]+\.[0-9]+(?![0-9]|[^\x00-\x7f])|[0-9]+(?!\.?(?:[0-9]|[^\x00-\x7f])))
+  | (?P<string>'[^'\\\0]*'|"[^"\\\0]*")
+  | (?P<comment>//[^\n\0]*|/\*.*?\*/)
+  | (?P<slow>.))
+''', re.VERBOSE | re.DOTALL)
+
+IDENTIFIER, OPERATOR, SPACE, NUMBER, STRING, COMMENT = range(1, 7)
+
+OPERATORS = {
+    '(': TokenType.LEFT_PAREN, ')': TokenType.RIGHT_PAREN,
+    '{': TokenType.LEFT_BRACE, '}': TokenType.RIGHT_BRACE,
+    ',': TokenType.COMMA, '.': TokenType.DOT, ';': TokenType.SEMICOLON,
+    '+': TokenType.PLUS, '-': TokenType.MINUS, '*': TokenType.STAR, '/': TokenType.SLASH,
+    '=': TokenType.EQUAL, '==': TokenType.EQUAL_EQUAL,
+    '!': TokenType.BANG, '!=': TokenType.BANG_EQUAL,
+    '<': TokenType.LESS, '<=': TokenType.LESS_EQUAL,
+    '>': TokenType.GREATER, '>=': TokenType.GREATER_EQUAL,
+}
+
 class Scanner:
     line = 1
     start = 0
@@ -17,16 +46,59 @@ class Scanner:
         return ScannerError(build_syntax_error(self, message, line))
 
     def scan_tokens(self, pox):
-        tokens = []
+        return list(self.tokens(pox))
 
+    # tokens are produced as the parser asks for them, so only the ones
+    # the ast ends up referring to are kept around
+    def tokens(self, pox):
+        while not self.is_at_end():
+            yield from self.scan_bulk()
+
+            if not self.is_at_end():
+                try:
+                    if token := self.scan_token():
+                        yield token
+                except ScannerError as err:
+                    pox.report_error(err)
+
+        yield Token(TokenType.EOF, "", None, self.line)
+
+    def scan_bulk(self):
+        line = self.line
+        keyword = RESERVED_KEYWORDS.get
+
+        for m in TOKEN_PATTERN.finditer(self.source, self.current):
+            kind = m.lastindex
+            text = m[kind]
+
+            if kind == IDENTIFIER:
+                yield Token(keyword(text, TokenType.IDENTIFIER), sys.intern(text), None, line)
+            elif kind == OPERATOR:
+                yield Token(OPERATORS[text], sys.intern(text), None, line)
+            elif kind == SPACE or kind == COMMENT:
+                line += text.count('\n')
+            elif kind == NUMBER:
+                yield Token(TokenType.NUMBER, sys.intern(text),
+                            float(text) if '.' in text else int(text), line)
+            elif kind == STRING:
+                # the pattern doesn't take backslashes, nothing to decode
+                line += text.count('\n')
+                yield Token(TokenType.STRING, sys.intern(text), text[1:-1], line)
+            else:
+                self.line, self.current = line, m.start(kind)
+                return
+
+        self.line, self.current = line, len(self.source)
+
+    def char_tokens(self, pox):
         while not self.is_at_end():
             try:
                 if token := self.scan_token():
-                    tokens.append(token)
+                    yield token
             except ScannerError as err:
                 pox.report_error(err)
 
-        return tokens + [Token(TokenType.EOF, "", None, self.line)]
+        yield Token(TokenType.EOF, "", None, self.line)
 
     def scan_token(self):
         self.start = self.current
@@ -82,7 +154,7 @@ class Scanner:
             return self.source[self.current - n]
 
     def peek(self, n=1):
-        if self.is_at_end():
+        if self.current + n > len(self.source):
             return '\0'
 
         return self.source[self.current + n - 1]
@@ -95,7 +167,8 @@ class Scanner:
         return True
 
     def make_token(self, type, literal=None):
-        return Token(type, self.source[self.start:self.current], literal, self.line)
+        # names and operators repeat a lot, tokens share a single copy of them
+        return Token(type, sys.intern(self.source[self.start:self.current]), literal, self.line)
 
     def scan_number(self):
         while self.peek().isdigit():
@@ -127,7 +200,10 @@ class Scanner:
                 case '\n': self.line += 1
                 case '\0': break
                 case _ if c == quote: break
-                case _ if c == '\\' and self.prev() != '\\': self.advance()
+                case _ if c == '\\' and self.prev() != '\\':
+                    self.advance()
+                    # an escaped newline is still one
+                    if self.peek() == '\n': self.line += 1
 
             self.advance()
 
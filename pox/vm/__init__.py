@@ -0,0 +1,5 @@
+# coding: utf-8
+
+from .opcodes import OpCode
+from .compiler import Compiler, CompileError
+from .vm import VM
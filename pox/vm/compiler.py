@@ -0,0 +1,418 @@
+# coding: utf-8
+
+from pox.error import CompileError
+from pox.scanner import Token, TokenType
+from pox.parser import ExprVisitor, StmtVisitor
+from pox.parser.exprs import Get, Super
+from pox.parser.resolver import FunctionType
+
+from .opcodes import OpCode
+from .object import FunctionProto
+
+U8_MAX  = 0xff
+U16_MAX = 0xffff
+
+BINARY_OPCODES = {
+    TokenType.PLUS:          OpCode.ADD,
+    TokenType.MINUS:         OpCode.SUBTRACT,
+    TokenType.STAR:          OpCode.MULTIPLY,
+    TokenType.SLASH:         OpCode.DIVIDE,
+    TokenType.LESS:          OpCode.LESS,
+    TokenType.GREATER:       OpCode.GREATER,
+    TokenType.LESS_EQUAL:    OpCode.LESS_EQUAL,
+    TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    TokenType.EQUAL_EQUAL:   OpCode.EQUAL,
+    TokenType.BANG_EQUAL:    OpCode.NOT_EQUAL,
+}
+
+class Local:
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.captured = False
+
+class FunctionState:
+    def __init__(self, enclosing, function, fn_type):
+        self.enclosing = enclosing
+        self.function = function
+        self.fn_type = fn_type
+
+        self.locals = []
+        self.upvalues = []
+        self.constants = {}
+        self.scope_depth = 0
+
+# compiles the statements produced by the parser into a `FunctionProto` of
+# the top-level script, locals live on the vm stack and are resolved here
+# instead of using the `Resolver` output, variables captured by closures
+# are turned into upvalues the same way clox does it
+class Compiler(ExprVisitor, StmtVisitor):
+    def __init__(self):
+        self.state = None
+
+    def compile(self, stmts):
+        self.begin_function('script', FunctionType.NONE)
+
+        for stmt in stmts:
+            self.statement(stmt)
+
+        return self.end_function()
+
+    @property
+    def chunk(self):
+        return self.state.function.chunk
+
+    def error(self, token, message):
+        return CompileError(token, message)
+
+    def emit(self, token, *data):
+        self.chunk.code.extend(data)
+        self.chunk.tokens.extend([token] * len(data))
+
+    def emit_u16(self, token, op, value):
+        self.emit(token, op, value >> 8, value & 0xff)
+
+    def emit_jump(self, op, token=None):
+        self.emit_u16(token, op, U16_MAX)
+        return len(self.chunk.code) - 2
+
+    def patch_jump(self, offset, token=None):
+        jump = len(self.chunk.code) - offset - 2
+
+        if jump > U16_MAX:
+            raise self.error(token, 'too much code to jump over')
+
+        self.chunk.code[offset] = jump >> 8
+        self.chunk.code[offset + 1] = jump & 0xff
+
+    def emit_loop(self, start, token=None):
+        offset = len(self.chunk.code) - start + 3
+
+        if offset > U16_MAX:
+            raise self.error(token, 'loop body too large')
+
+        self.emit_u16(token, OpCode.LOOP, offset)
+
+    def make_constant(self, value, token=None):
+        # `0.0 == -0.0`, floats go by their repr so the sign isn't lost
+        key = (float, repr(value)) if type(value) is float else (type(value), value)
+
+        if (index := self.state.constants.get(key)) is None:
+            index = len(self.chunk.constants)
+
+            if index > U16_MAX:
+                raise self.error(token, 'too many constants in one chunk')
+
+            self.chunk.constants.append(value)
+            self.state.constants[key] = index
+
+        return index
+
+    def begin_function(self, name, fn_type):
+        self.state = FunctionState(self.state, FunctionProto(name), fn_type)
+        # slot zero holds the callee, or the receiver for methods
+        self.state.locals.append(
+            Local('this' if fn_type in (FunctionType.METHOD, FunctionType.INITIALIZER) else '', 0))
+
+    def end_function(self):
+        self.emit_return()
+
+        state = self.state
+        state.function.upvalue_count = len(state.upvalues)
+        self.state = state.enclosing
+
+        return state.function, state.upvalues
+
+    def emit_return(self, token=None):
+        if self.state.fn_type == FunctionType.INITIALIZER:
+            self.emit(token, OpCode.GET_LOCAL, 0)
+        else:
+            self.emit(token, OpCode.NIL)
+
+        self.emit(token, OpCode.RETURN)
+
+    def begin_scope(self):
+        self.state.scope_depth += 1
+
+    def end_scope(self):
+        state = self.state
+        state.scope_depth -= 1
+
+        while state.locals and state.locals[-1].depth > state.scope_depth:
+            self.emit(None, OpCode.CLOSE_UPVALUE if state.locals[-1].captured else OpCode.POP)
+            state.locals.pop()
+
+    def add_local(self, name):
+        if len(self.state.locals) > U8_MAX:
+            raise self.error(name, 'too many local variables in function')
+
+        self.state.locals.append(Local(name.lexeme, self.state.scope_depth))
+
+    def resolve_local(self, state, name):
+        for i in range(len(state.locals) - 1, -1, -1):
+            if state.locals[i].name == name.lexeme:
+                return i
+
+        return -1
+
+    def add_upvalue(self, state, index, is_local, name):
+        upvalue = (is_local, index)
+
+        if upvalue in state.upvalues:
+            return state.upvalues.index(upvalue)
+
+        if len(state.upvalues) > U8_MAX:
+            raise self.error(name, 'too many closure variables in function')
+
+        state.upvalues.append(upvalue)
+        return len(state.upvalues) - 1
+
+    def resolve_upvalue(self, state, name):
+        if state.enclosing is None:
+            return -1
+
+        if (local := self.resolve_local(state.enclosing, name)) != -1:
+            state.enclosing.locals[local].captured = True
+            return self.add_upvalue(state, local, 1, name)
+
+        if (upvalue := self.resolve_upvalue(state.enclosing, name)) != -1:
+            return self.add_upvalue(state, upvalue, 0, name)
+
+        return -1
+
+    def named_variable(self, name, assign=False):
+        if (arg := self.resolve_local(self.state, name)) != -1:
+            self.emit(name, OpCode.SET_LOCAL if assign else OpCode.GET_LOCAL, arg)
+        elif (arg := self.resolve_upvalue(self.state, name)) != -1:
+            self.emit(name, OpCode.SET_UPVALUE if assign else OpCode.GET_UPVALUE, arg)
+        else:
+            self.emit_u16(
+                name, OpCode.SET_GLOBAL if assign else OpCode.GET_GLOBAL,
+                self.make_constant(name.lexeme, name))
+
+    def declare_variable(self, name):
+        if self.state.scope_depth > 0:
+            self.add_local(name)
+
+    def define_variable(self, name):
+        if self.state.scope_depth > 0:
+            return
+
+        self.emit_u16(name, OpCode.DEFINE_GLOBAL, self.make_constant(name.lexeme, name))
+
+    def statement(self, stmt):
+        if stmt:
+            stmt.accept(self)
+
+    def expression(self, expr):
+        expr.accept(self)
+
+    def function(self, stmt, fn_type):
+        self.begin_function(stmt.name.lexeme, fn_type)
+        self.begin_scope()
+
+        if len(stmt.params) > U8_MAX:
+            raise self.error(stmt.name, 'can\'t have more than 255 parameters')
+
+        self.state.function.arity = len(stmt.params)
+
+        for param in stmt.params:
+            self.add_local(param)
+
+        # calls stop at the first instruction and hand back a generator
+        if stmt.generator:
+            self.emit(stmt.name, OpCode.GENERATOR)
+
+        for body_stmt in stmt.body.statements:
+            self.statement(body_stmt)
+
+        function, upvalues = self.end_function()
+
+        self.emit_u16(stmt.name, OpCode.CLOSURE, self.make_constant(function, stmt.name))
+        for is_local, index in upvalues:
+            self.emit(stmt.name, is_local, index)
+
+    def arguments(self, arguments, paren):
+        if len(arguments) > U8_MAX:
+            raise self.error(paren, 'can\'t have more than 255 arguments')
+
+        for argument in arguments:
+            self.expression(argument)
+
+    def visit_assign_expr(self, expr):
+        self.expression(expr.value)
+        self.named_variable(expr.name, assign=True)
+
+    def visit_binary_expr(self, expr):
+        self.expression(expr.lt)
+        self.expression(expr.rt)
+        self.emit(expr.op, BINARY_OPCODES[expr.op.type])
+
+    def visit_call_expr(self, expr):
+        match expr.callee:
+            case Get(object=object, name=name):
+                self.expression(object)
+                self.arguments(expr.arguments, expr.paren)
+
+                index = self.make_constant(name.lexeme, name)
+                self.emit(expr.paren, OpCode.INVOKE)
+                self.emit(name, index >> 8, index & 0xff)
+                self.emit(expr.paren, len(expr.arguments))
+
+            case Super(keyword=keyword, method=method):
+                self.named_variable(Token(TokenType.THIS, 'this', None, keyword.line))
+                self.arguments(expr.arguments, expr.paren)
+                self.named_variable(keyword)
+
+                index = self.make_constant(method.lexeme, method)
+                self.emit(expr.paren, OpCode.SUPER_INVOKE)
+                self.emit(method, index >> 8, index & 0xff)
+                self.emit(expr.paren, len(expr.arguments))
+
+            case callee:
+                self.expression(callee)
+                self.arguments(expr.arguments, expr.paren)
+                self.emit(expr.paren, OpCode.CALL, len(expr.arguments))
+
+    def visit_grouping_expr(self, expr):
+        self.expression(expr.expression)
+
+    def visit_get_expr(self, expr):
+        self.expression(expr.object)
+        self.emit_u16(expr.name, OpCode.GET_PROPERTY, self.make_constant(expr.name.lexeme))
+
+    def visit_literal_expr(self, expr):
+        match expr.value:
+            case None:  self.emit(None, OpCode.NIL)
+            case True:  self.emit(None, OpCode.TRUE)
+            case False: self.emit(None, OpCode.FALSE)
+            case value:
+                self.emit_u16(None, OpCode.CONSTANT, self.make_constant(value))
+
+    def visit_logical_expr(self, expr):
+        self.expression(expr.lt)
+
+        jump = self.emit_jump(
+            OpCode.JUMP_IF_TRUE if expr.op.type == TokenType.OR else OpCode.JUMP_IF_FALSE)
+
+        self.expression(expr.rt)
+        self.patch_jump(jump, expr.op)
+
+    def visit_set_expr(self, expr):
+        self.expression(expr.object)
+        self.expression(expr.value)
+        self.emit_u16(expr.name, OpCode.SET_PROPERTY, self.make_constant(expr.name.lexeme))
+
+    def visit_super_expr(self, expr):
+        self.named_variable(Token(TokenType.THIS, 'this', None, expr.keyword.line))
+        self.named_variable(expr.keyword)
+        self.emit_u16(expr.method, OpCode.GET_SUPER, self.make_constant(expr.method.lexeme))
+
+    def visit_this_expr(self, expr):
+        self.named_variable(expr.keyword)
+
+    def visit_unary_expr(self, expr):
+        self.expression(expr.expression)
+        self.emit(expr.op, OpCode.NOT if expr.op.type == TokenType.BANG else OpCode.NEGATE)
+
+    def visit_variable_expr(self, expr):
+        self.named_variable(expr.name)
+
+    def visit_block_stmt(self, stmt):
+        self.begin_scope()
+
+        for block_stmt in stmt.statements:
+            self.statement(block_stmt)
+
+        self.end_scope()
+
+    def visit_class_stmt(self, stmt):
+        name = stmt.name
+
+        self.declare_variable(name)
+        self.emit_u16(name, OpCode.CLASS, self.make_constant(name.lexeme, name))
+        self.define_variable(name)
+
+        if stmt.superclass:
+            self.named_variable(stmt.superclass.name)
+
+            self.begin_scope()
+            self.add_local(Token(TokenType.SUPER, 'super', None, name.line))
+
+            self.named_variable(name)
+            self.emit(stmt.superclass.name, OpCode.INHERIT)
+
+        self.named_variable(name)
+
+        for method in stmt.methods:
+            self.function(
+                method, FunctionType.INITIALIZER \
+                        if method.name.lexeme == 'init' else FunctionType.METHOD)
+            self.emit_u16(
+                method.name, OpCode.METHOD, self.make_constant(method.name.lexeme))
+
+        self.emit(None, OpCode.POP)
+
+        if stmt.superclass:
+            self.end_scope()
+
+    def visit_expression_stmt(self, stmt):
+        self.expression(stmt.expression)
+        self.emit(None, OpCode.POP)
+
+    def visit_function_stmt(self, stmt):
+        # functions can refer to themselves, so the local is usable
+        # before the body gets compiled
+        self.declare_variable(stmt.name)
+        self.function(stmt, FunctionType.FUNCTION)
+        self.define_variable(stmt.name)
+
+    def visit_if_stmt(self, stmt):
+        exits = []
+
+        for cond, branch in stmt.branches:
+            self.expression(cond)
+            jump = self.emit_jump(OpCode.POP_JUMP_IF_FALSE)
+            self.statement(branch)
+            exits.append(self.emit_jump(OpCode.JUMP))
+            self.patch_jump(jump)
+
+        if stmt.else_branch:
+            self.statement(stmt.else_branch)
+
+        for jump in exits:
+            self.patch_jump(jump)
+
+    def visit_return_stmt(self, stmt):
+        if stmt.value is None:
+            return self.emit_return(stmt.keyword)
+
+        self.expression(stmt.value)
+        self.emit(stmt.keyword, OpCode.TAIL_RETURN if stmt.tail else OpCode.RETURN)
+
+    def visit_yield_stmt(self, stmt):
+        if stmt.value is None:
+            self.emit(stmt.keyword, OpCode.NIL)
+        else:
+            self.expression(stmt.value)
+
+        self.emit(stmt.keyword, OpCode.YIELD)
+
+    def visit_let_stmt(self, stmt):
+        self.declare_variable(stmt.name)
+
+        if stmt.initializer:
+            self.expression(stmt.initializer)
+        else:
+            self.emit(None, OpCode.NIL)
+
+        self.define_variable(stmt.name)
+
+    def visit_while_stmt(self, stmt):
+        start = len(self.chunk.code)
+
+        self.expression(stmt.condition)
+        exit = self.emit_jump(OpCode.POP_JUMP_IF_FALSE)
+        self.statement(stmt.body)
+        self.emit_loop(start)
+        self.patch_jump(exit)
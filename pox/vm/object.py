@@ -0,0 +1,109 @@
+# coding: utf-8
+
+from array import array
+
+from pox.interpreter.callable import PoxCallable, PoxClass, Yielded
+from pox.interpreter.native import GENERATOR, GeneratorInstance
+
+class Chunk:
+    def __init__(self):
+        self.code = array('B')
+        self.constants = []
+        # token of every byte in `code`, used for error reporting
+        self.tokens = []
+
+class FunctionProto:
+    def __init__(self, name):
+        self.name = name
+        self.arity = 0
+        self.chunk = Chunk()
+        self.upvalue_count = 0
+
+    def __str__(self):
+        return f'<fn {self.name}>'
+
+class Upvalue:
+    __slots__ = ('cells', 'index')
+
+    # an open upvalue points into the vm stack, closing it moves the value
+    # into a list of its own so reads are `cells[index]` in both cases
+    def __init__(self, cells, index):
+        self.cells = cells
+        self.index = index
+
+    def close(self):
+        self.cells = [self.cells[self.index]]
+        self.index = 0
+
+class Closure(PoxCallable):
+    __slots__ = ('function', 'upvalues', 'vm')
+
+    def __init__(self, vm, function, upvalues):
+        self.vm = vm
+        self.function = function
+        self.upvalues = upvalues
+
+    def __str__(self):
+        return str(self.function)
+
+    def arity(self):
+        return self.function.arity
+
+    def call(self, _, arguments):
+        return self.vm.call(self, None, arguments)
+
+    def bind(self, instance):
+        return BoundMethod(instance, self)
+
+class BoundMethod(PoxCallable):
+    __slots__ = ('receiver', 'method')
+
+    def __init__(self, receiver, method):
+        self.receiver = receiver
+        self.method = method
+
+    def __str__(self):
+        return str(self.method)
+
+    def arity(self):
+        return self.method.arity()
+
+    def call(self, _, arguments):
+        return self.method.vm.call(self.method, self.receiver, arguments)
+
+class VMClass(PoxClass):
+    # methods of the superclass are copied into `methods` on `INHERIT`, so
+    # method lookups never have to walk up the class hierarchy
+    def __init__(self, vm, name):
+        super().__init__(name, None, {})
+        self.vm = vm
+        self.table = self.methods
+
+    def call(self, _, arguments):
+        return self.vm.call(self, None, arguments)
+
+class VMGenerator(GeneratorInstance):
+    # the frame of the call that made it, moved off the vm stack into a stack
+    # of its own, the upvalues open on it and where to carry on in its code
+    def __init__(self, vm, closure, stack, ip):
+        super().__init__(GENERATOR, closure)
+        self.vm = vm
+        self.closure = closure
+        self.stack = stack
+        self.upvalues = {}
+        self.ip = ip
+
+    # the body runs on its own stack, closures made in it point there
+    def resume(self):
+        vm = self.vm
+        stack, upvalues = vm.stack, vm.open_upvalues
+        vm.stack, vm.open_upvalues = self.stack, self.upvalues
+
+        try:
+            suspended = vm.run(self.closure, 0, self.ip)
+        finally:
+            vm.stack, vm.open_upvalues = stack, upvalues
+
+        if suspended is not None:
+            value, self.ip = suspended
+            return Yielded(value)
@@ -0,0 +1,42 @@
+# coding: utf-8
+
+from enum import IntEnum
+
+# operands follow the opcode in the code array, `u8` operands take a single
+# byte, `u16` operands (constant pool indices and jump offsets) take two
+# bytes in big endian order
+#
+#   CONSTANT      u16 constant
+#   GET_LOCAL     u8  slot             SET_LOCAL     u8  slot
+#   GET_UPVALUE   u8  index            SET_UPVALUE   u8  index
+#   GET_GLOBAL    u16 name             SET_GLOBAL    u16 name
+#   DEFINE_GLOBAL u16 name
+#   GET_PROPERTY  u16 name             SET_PROPERTY  u16 name
+#   GET_SUPER     u16 name
+#   JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE, POP_JUMP_IF_FALSE  u16 forward offset
+#   LOOP          u16 backward offset
+#   CALL          u8  argc
+#   INVOKE        u16 name, u8 argc    SUPER_INVOKE  u16 name, u8 argc
+#   CLOSURE       u16 function, then (u8 is_local, u8 index) per upvalue
+#   CLASS         u16 name             METHOD        u16 name
+#
+# `TAIL_RETURN` follows the call of a `return f(...)`, a call to a closure
+# that sees it next reuses the caller's frame instead of pushing one
+OpCode = IntEnum('OpCode', '''
+    CONSTANT NIL TRUE FALSE POP
+
+    GET_LOCAL SET_LOCAL GET_UPVALUE SET_UPVALUE
+    GET_GLOBAL SET_GLOBAL DEFINE_GLOBAL
+    GET_PROPERTY SET_PROPERTY GET_SUPER
+
+    EQUAL NOT_EQUAL GREATER GREATER_EQUAL LESS LESS_EQUAL
+    ADD SUBTRACT MULTIPLY DIVIDE NOT NEGATE
+
+    JUMP JUMP_IF_FALSE JUMP_IF_TRUE POP_JUMP_IF_FALSE LOOP
+
+    CALL INVOKE SUPER_INVOKE CLOSURE CLOSE_UPVALUE RETURN TAIL_RETURN
+
+    CLASS INHERIT METHOD
+
+    GENERATOR YIELD
+''', start=0)
@@ -0,0 +1,503 @@
+# coding: utf-8
+
+from pox.error import CompileError, NativeError, RuntimeError
+from pox.utils import number, stringify
+
+from pox.interpreter.callable import PoxCallable, PoxClass, PoxInstance
+from pox.interpreter.environment import Environment
+from pox.interpreter.native import init_native_functions
+from pox.interpreter.output import Output
+from pox.interpreter.stack import MAX_DEPTH
+
+from .compiler import Compiler
+from .object import BoundMethod, Closure, Upvalue, VMClass, VMGenerator
+from .opcodes import OpCode
+
+# the dispatch loop compares `op` against these on every instruction,
+# plain ints are a lot cheaper to compare than `IntEnum` members
+globals().update({op.name: op.value for op in OpCode})
+
+# operands of these types skip the `numbers.Number` check
+NUMBERS = frozenset([int, float, bool])
+
+def check_number_operands(token, *operands):
+    if not number(*operands):
+        raise RuntimeError(token, 'operands must be numbers')
+
+class VM:
+    def __init__(self, max_depth=MAX_DEPTH):
+        self.max_depth = max_depth
+        self.stack = []
+        self.open_upvalues = {}
+        self.globals = Environment()
+        self.output = Output()
+        self.sources = []
+
+        init_native_functions(self)
+
+    def resolve(self, *_):
+        # the compiler resolves locals and upvalues on its own
+        pass
+
+    def interpret(self, stmts, pox):
+        try:
+            function, _ = Compiler().compile(stmts)
+        except CompileError as err:
+            return pox.report_error(err)
+
+        try:
+            self.call(Closure(self, function, []), None, [])
+        except RuntimeError as err:
+            self.stack.clear()
+            self.open_upvalues.clear()
+            self.output.flush()
+            pox.report_error(err)
+        finally:
+            self.output.flush()
+
+    def call(self, callee, receiver, arguments):
+        if isinstance(callee, VMClass):
+            receiver = PoxInstance(callee)
+
+            if not (callee := callee.methods.get('init')):
+                return receiver
+
+        base = len(self.stack)
+
+        self.stack.append(callee if receiver is None else receiver)
+        self.stack.extend(arguments)
+
+        return self.run(callee, base)
+
+    def call_value(self, callee, argc, token):
+        # sets up the stack for calling `callee`, returns the closure the
+        # caller needs to push a frame for, or `None` if the call is done
+        stack = self.stack
+
+        match callee:
+            case BoundMethod():
+                stack[-1 - argc] = callee.receiver
+                return callee.method
+
+            case VMClass():
+                stack[-1 - argc] = PoxInstance(callee)
+
+                if init := callee.methods.get('init'):
+                    return init
+
+                if argc != 0:
+                    raise RuntimeError(token, f'expected 0 arguments but got {argc}')
+
+            case PoxCallable():
+                if argc != callee.arity():
+                    raise RuntimeError(
+                        token, f'expected {callee.arity()} arguments but got {argc}')
+
+                arguments = stack[len(stack) - argc:]
+                del stack[len(stack) - argc - 1:]
+
+                try:
+                    stack.append(callee.call(self, arguments))
+                except NativeError as err:
+                    raise RuntimeError(token, err.message)
+
+            case _:
+                raise RuntimeError(token, 'can only call functions and classes')
+
+    def error(self, closure, ip, message):
+        return RuntimeError(closure.function.chunk.tokens[ip - 1], message)
+
+    def capture_upvalue(self, slot):
+        if (upvalue := self.open_upvalues.get(slot)) is None:
+            upvalue = self.open_upvalues[slot] = Upvalue(self.stack, slot)
+
+        return upvalue
+
+    def close_upvalues(self, last):
+        for slot in [slot for slot in self.open_upvalues if slot >= last]:
+            self.open_upvalues.pop(slot).close()
+
+    def run(self, closure, base, ip=0):
+        stack = self.stack
+        push = stack.append
+        pop = stack.pop
+        globals = self.globals.values
+
+        frames = []
+        code = closure.function.chunk.code
+        constants = closure.function.chunk.constants
+
+        while True:
+            op = code[ip]
+            ip += 1
+
+            if op == GET_LOCAL:
+                push(stack[base + code[ip]])
+                ip += 1
+
+            elif op == GET_PROPERTY:
+                name = constants[(code[ip] << 8) | code[ip + 1]]
+                ip += 2
+                object = stack[-1]
+
+                if type(object) is PoxInstance and name in object.fields:
+                    stack[-1] = object.fields[name]
+                elif isinstance(object, PoxInstance):
+                    stack[-1] = object.get(closure.function.chunk.tokens[ip - 1])
+                else:
+                    raise self.error(closure, ip, 'only instances have properties')
+
+            elif op == CONSTANT:
+                push(constants[(code[ip] << 8) | code[ip + 1]])
+                ip += 2
+
+            elif CALL <= op <= SUPER_INVOKE:
+                if op == INVOKE:
+                    name = constants[(code[ip] << 8) | code[ip + 1]]
+                    argc = code[ip + 2]
+                    ip += 3
+                    object = stack[-1 - argc]
+
+                    if type(object) is PoxInstance:
+                        if name in object.fields:
+                            callee = stack[-1 - argc] = object.fields[name]
+                        elif (callee := object.pclass.methods.get(name)) is None:
+                            object.get(closure.function.chunk.tokens[ip - 2])
+                        elif type(callee) is not Closure:
+                            # a native method inherited from a native class,
+                            # bound so the call goes through its `invoke`
+                            callee = stack[-1 - argc] = callee.bind(object)
+                    elif isinstance(object, PoxInstance):
+                        callee = stack[-1 - argc] = object.get(
+                            closure.function.chunk.tokens[ip - 2])
+                    else:
+                        raise self.error(closure, ip - 1, 'only instances have properties')
+
+                elif op == CALL:
+                    argc = code[ip]
+                    ip += 1
+                    callee = stack[-1 - argc]
+
+                else:
+                    name = constants[(code[ip] << 8) | code[ip + 1]]
+                    argc = code[ip + 2]
+                    ip += 3
+
+                    if (callee := pop().find_method(name)) is None:
+                        raise self.error(closure, ip - 1, f'undefined property {name}')
+
+                    if type(callee) is not Closure:
+                        # bound like `INVOKE` does, so it checks the receiver
+                        callee = stack[-1 - argc] = callee.bind(stack[-1 - argc])
+
+                if type(callee) is not Closure:
+                    if (callee := self.call_value(
+                            callee, argc, closure.function.chunk.tokens[ip - 1])) is None:
+                        continue
+
+                if argc != callee.function.arity:
+                    raise self.error(
+                        closure, ip,
+                        f'expected {callee.function.arity} arguments but got {argc}')
+
+                if code[ip] == TAIL_RETURN:
+                    # the callee and its arguments take the place of the
+                    # returning frame, which is left like `RETURN` leaves it
+                    if self.open_upvalues:
+                        self.close_upvalues(base)
+
+                    stack[base:] = stack[len(stack) - argc - 1:]
+                else:
+                    if len(frames) >= self.max_depth:
+                        raise self.error(
+                            closure, ip, f'stack overflow, more than {self.max_depth} calls deep')
+
+                    frames.append((closure, code, constants, ip, base))
+                    base = len(stack) - argc - 1
+
+                closure = callee
+                code = callee.function.chunk.code
+                constants = callee.function.chunk.constants
+                ip = 0
+
+            elif op == GET_GLOBAL:
+                name = constants[(code[ip] << 8) | code[ip + 1]]
+                ip += 2
+
+                try:
+                    push(globals[name])
+                except KeyError:
+                    raise self.error(closure, ip, f'undefined variable {name}')
+
+            elif op == POP:
+                pop()
+
+            elif op == SET_LOCAL:
+                stack[base + code[ip]] = stack[-1]
+                ip += 1
+
+            elif op == ADD:
+                rt = pop()
+                lt = stack[-1]
+
+                if type(lt) in NUMBERS and type(rt) in NUMBERS:
+                    stack[-1] = lt + rt
+                elif isinstance(lt, str) or isinstance(rt, str):
+                    stack[-1] = f'{stringify(lt)}{stringify(rt)}'
+                else:
+                    try:
+                        stack[-1] = lt + rt
+                    except TypeError:
+                        raise self.error(closure, ip, 'operands must be numbers or strings')
+
+            elif op == SUBTRACT:
+                rt = pop()
+                lt = stack[-1]
+
+                if type(lt) not in NUMBERS or type(rt) not in NUMBERS:
+                    check_number_operands(closure.function.chunk.tokens[ip - 1], lt, rt)
+
+                stack[-1] = lt - rt
+
+            elif op == MULTIPLY:
+                rt = pop()
+                lt = stack[-1]
+
+                if type(lt) not in NUMBERS or type(rt) not in NUMBERS:
+                    check_number_operands(closure.function.chunk.tokens[ip - 1], lt, rt)
+
+                stack[-1] = lt * rt
+
+            elif op == RETURN:
+                result = pop()
+
+                if self.open_upvalues:
+                    self.close_upvalues(base)
+
+                del stack[base:]
+
+                if not frames:
+                    return result
+
+                push(result)
+                closure, code, constants, ip, base = frames.pop()
+
+            elif op == POP_JUMP_IF_FALSE:
+                if pop():
+                    ip += 2
+                else:
+                    ip += 2 + ((code[ip] << 8) | code[ip + 1])
+
+            elif op == LESS:
+                rt = pop()
+                lt = stack[-1]
+
+                if type(lt) not in NUMBERS or type(rt) not in NUMBERS:
+                    check_number_operands(closure.function.chunk.tokens[ip - 1], lt, rt)
+
+                stack[-1] = lt < rt
+
+            elif op == LOOP:
+                ip += 2 - ((code[ip] << 8) | code[ip + 1])
+
+            elif op == JUMP:
+                ip += 2 + ((code[ip] << 8) | code[ip + 1])
+
+            elif op == SET_PROPERTY:
+                name = constants[(code[ip] << 8) | code[ip + 1]]
+                ip += 2
+                value = pop()
+                object = stack[-1]
+
+                if not isinstance(object, PoxInstance):
+                    raise self.error(closure, ip, 'only instances have fields')
+
+                object.fields[name] = value
+                stack[-1] = value
+
+            elif op == GET_UPVALUE:
+                upvalue = closure.upvalues[code[ip]]
+                push(upvalue.cells[upvalue.index])
+                ip += 1
+
+            elif op == SET_UPVALUE:
+                upvalue = closure.upvalues[code[ip]]
+                upvalue.cells[upvalue.index] = stack[-1]
+                ip += 1
+
+            elif op == DIVIDE:
+                rt = pop()
+                lt = stack[-1]
+
+                if type(lt) not in NUMBERS or type(rt) not in NUMBERS:
+                    check_number_operands(closure.function.chunk.tokens[ip - 1], lt, rt)
+
+                if rt == 0:
+                    raise self.error(closure, ip, 'division by zero')
+
+                stack[-1] = lt / rt
+
+            elif op == GREATER:
+                rt = pop()
+                lt = stack[-1]
+
+                if type(lt) not in NUMBERS or type(rt) not in NUMBERS:
+                    check_number_operands(closure.function.chunk.tokens[ip - 1], lt, rt)
+
+                stack[-1] = lt > rt
+
+            elif op == LESS_EQUAL:
+                rt = pop()
+                lt = stack[-1]
+
+                if type(lt) not in NUMBERS or type(rt) not in NUMBERS:
+                    check_number_operands(closure.function.chunk.tokens[ip - 1], lt, rt)
+
+                stack[-1] = lt <= rt
+
+            elif op == GREATER_EQUAL:
+                rt = pop()
+                lt = stack[-1]
+
+                if type(lt) not in NUMBERS or type(rt) not in NUMBERS:
+                    check_number_operands(closure.function.chunk.tokens[ip - 1], lt, rt)
+
+                stack[-1] = lt >= rt
+
+            elif op == EQUAL:
+                rt = pop()
+                stack[-1] = stack[-1] == rt
+
+            elif op == NOT_EQUAL:
+                rt = pop()
+                stack[-1] = not (stack[-1] == rt)
+
+            elif op == NIL:
+                push(None)
+
+            elif op == TRUE:
+                push(True)
+
+            elif op == FALSE:
+                push(False)
+
+            elif op == NOT:
+                stack[-1] = not stack[-1]
+
+            elif op == NEGATE:
+                if type(stack[-1]) not in NUMBERS:
+                    check_number_operands(closure.function.chunk.tokens[ip - 1], stack[-1])
+
+                stack[-1] = -stack[-1]
+
+            elif op == JUMP_IF_FALSE:
+                if stack[-1]:
+                    pop()
+                    ip += 2
+                else:
+                    ip += 2 + ((code[ip] << 8) | code[ip + 1])
+
+            elif op == JUMP_IF_TRUE:
+                if stack[-1]:
+                    ip += 2 + ((code[ip] << 8) | code[ip + 1])
+                else:
+                    pop()
+                    ip += 2
+
+            elif op == SET_GLOBAL:
+                name = constants[(code[ip] << 8) | code[ip + 1]]
+                ip += 2
+
+                if name not in globals:
+                    raise self.error(closure, ip, f'undefined variable {name}')
+
+                globals[name] = stack[-1]
+
+            elif op == DEFINE_GLOBAL:
+                globals[constants[(code[ip] << 8) | code[ip + 1]]] = pop()
+                ip += 2
+
+            elif op == CLOSURE:
+                function = constants[(code[ip] << 8) | code[ip + 1]]
+                ip += 2
+                upvalues = []
+
+                for _ in range(function.upvalue_count):
+                    if code[ip]:
+                        upvalues.append(self.capture_upvalue(base + code[ip + 1]))
+                    else:
+                        upvalues.append(closure.upvalues[code[ip + 1]])
+
+                    ip += 2
+
+                push(Closure(self, function, upvalues))
+
+            elif op == CLOSE_UPVALUE:
+                if upvalue := self.open_upvalues.pop(len(stack) - 1, None):
+                    upvalue.close()
+
+                pop()
+
+            elif op == GET_SUPER:
+                name = constants[(code[ip] << 8) | code[ip + 1]]
+                ip += 2
+                superclass = pop()
+
+                if (method := superclass.find_method(name)) is None:
+                    raise self.error(closure, ip, f'undefined property {name}')
+
+                if type(method) is Closure:
+                    stack[-1] = BoundMethod(stack[-1], method)
+                else:
+                    stack[-1] = method.bind(stack[-1])
+
+            elif op == CLASS:
+                push(VMClass(self, constants[(code[ip] << 8) | code[ip + 1]]))
+                ip += 2
+
+            elif op == INHERIT:
+                superclass = stack[-2]
+
+                if not isinstance(superclass, PoxClass):
+                    raise self.error(closure, ip, '`superclass` must be a class')
+
+                subclass = pop()
+                subclass.superclass = superclass
+                subclass.methods.update(superclass.table)
+
+            elif op == METHOD:
+                method = pop()
+                stack[-1].methods[constants[(code[ip] << 8) | code[ip + 1]]] = method
+                ip += 2
+
+            elif op == TAIL_RETURN:
+                # only reached when the call before it wasn't to a closure
+                # (a native or a class without `init`), which is already done
+                result = pop()
+
+                if self.open_upvalues:
+                    self.close_upvalues(base)
+
+                del stack[base:]
+
+                if not frames:
+                    return result
+
+                push(result)
+                closure, code, constants, ip, base = frames.pop()
+
+            elif op == GENERATOR:
+                # the frame just set up for the call goes with the generator
+                generator = VMGenerator(self, closure, stack[base:], ip)
+                del stack[base:]
+
+                if not frames:
+                    return generator
+
+                push(generator)
+                closure, code, constants, ip, base = frames.pop()
+
+            elif op == YIELD:
+                # only ever runs in the generator's own frame, the one `resume`
+                # started `run` with. the body returns nothing when it's done
+                return pop(), ip
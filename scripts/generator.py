@@ -12,12 +12,14 @@ FILE_HEADER = '''\
 from abc import ABC, abstractmethod
 
 class {0}:
-    pass
+    __slots__ = ()
 '''
 
 ASSGN_TEMPLATE = ' ' * 8 + 'self.{0} = {0}'
 CLASS_TEMPLATE = '''\
 class {0}({1}):
+    __slots__ = {6}
+
     def __init__(self, {2}):
 {3}
 
@@ -36,11 +38,17 @@ VISIT_TEMPLATE = '''\
         pass
 '''
 
+# fields can be given a default value with `name=value`, these are used for
+# state the interpreter attaches to a node rather than for parser output.
+# nodes are slotted, large programs have a lot of them
 def generate_class(cname, name, *fields):
+    names = [f.split('=')[0] for f in fields]
     params = ', '.join(f for f in fields)
-    fields = '\n'.join(ASSGN_TEMPLATE.format(f) for f in fields)
+    slots = repr(tuple(names))
 
-    return CLASS_TEMPLATE.format(name, cname, params, fields, name.lower(), cname.lower())
+    return CLASS_TEMPLATE.format(
+        name, cname, params, '\n'.join(ASSGN_TEMPLATE.format(n) for n in names),
+        name.lower(), cname.lower(), slots)
 
 def generate_file(cname, data):
     visits = '\n'.join(VISIT_TEMPLATE.format(e.lower(), cname.lower()) for e, *_ in data)
@@ -57,18 +65,18 @@ def main():
     exprs = (
         'Expr',
         [
-            ['Assign', 'name', 'value'],
+            ['Assign', 'name', 'value', 'depth=None', 'slot=None'],
             ['Binary', 'lt', 'op', 'rt'],
-            ['Call', 'callee', 'paren', 'arguments'],
+            ['Call', 'callee', 'paren', 'arguments', 'cache=None'],
             ['Grouping', 'expression'],
-            ['Get', 'object', 'name'],
+            ['Get', 'object', 'name', 'cache=None'],
             ['Literal', 'value'],
             ['Logical', 'lt', 'op', 'rt'],
             ['Set', 'object', 'name', 'value'],
             ['Super', 'keyword', 'method'],
             ['This', 'keyword'],
             ['Unary', 'op', 'expression'],
-            ['Variable', 'name'],
+            ['Variable', 'name', 'depth=None', 'slot=None'],
         ]
     )
 
@@ -78,11 +86,12 @@ def main():
             ['Block', 'statements'],
             ['Class', 'name', 'superclass', 'methods'],
             ['Expression', 'expression'],
-            ['Function', 'name', 'params', 'body'],
+            ['Function', 'name', 'params', 'body', 'generator=False'],
             ['If', 'branches', 'else_branch'],
-            ['Return', 'keyword', 'value'],
+            ['Return', 'keyword', 'value', 'tail=False'],
             ['Let', 'name', 'initializer'],
             ['While', 'condition', 'body'],
+            ['Yield', 'keyword', 'value'],
         ]
     )
 